@@ -0,0 +1,713 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""
+* Author: Zongjian Yang
+* Date: 2026/10/19 上午10:12
+* Project: OSExperimenter
+* File: benchmark.py
+* IDE: PyCharm
+* Function: 各实验数据结构与模拟器的性能基准测试
+"""
+import io
+import os
+import random
+import time
+import tempfile
+import threading
+import contextlib
+import numpy as np
+from util import UniqueStack
+from file_manager import FileManager, FATFileSystem
+from process_manager import ProcessManager, FrameAllocator, PagingStats, PageStore, PageReclaimer, Readahead, \
+    Telemetry, EventDriver, BLOCK_NUM, BLOCK_SIZE
+
+
+class ListUniqueStack:
+    """原基于列表实现的LRU栈，仅作为基准测试中的对照组。"""
+    def __init__(self, init: list, capacity=3):
+        self.stack = init
+        self.set = set(init)
+        self.capacity = capacity
+
+    def push(self, value) -> None:
+        if value in self.set:
+            self.stack.remove(value)
+        elif len(self.stack) >= self.capacity:
+            self.set.remove(self.stack.pop(0))
+        self.stack.append(value)
+        self.set.add(value)
+
+
+def bench_lru(capacity: int = 100_000, ops: int = 1_000_000, baseline_ops: int = 2_000) -> dict:
+    """
+    LRU栈基准测试：访问序列的页号范围为容量的两倍，命中与缺页各占一定比例。
+    :param capacity: 栈容量（物理块数）
+    :param ops: 新实现的访问次数
+    :param baseline_ops: 列表实现的访问次数（其单次操作为 O(capacity)，故取较小值）
+    :return: 各实现的单次操作耗时（纳秒）
+    """
+    rng = random.Random(42)
+    trace = [rng.randrange(capacity * 2) for _ in range(ops)]
+    warm = list(range(capacity))
+    result = {}
+
+    stack = UniqueStack(warm, capacity)
+    start = time.perf_counter()
+    for value in trace:
+        stack.push(value)
+    result['push'] = (time.perf_counter() - start) / ops * 1e9
+
+    stack = UniqueStack(warm, capacity)
+    start = time.perf_counter()
+    misses = stack.access_many(trace)
+    result['access_many'] = (time.perf_counter() - start) / ops * 1e9
+    result['miss_rate'] = misses / ops
+
+    stack = ListUniqueStack(warm[:], capacity)
+    start = time.perf_counter()
+    for value in trace[:baseline_ops]:
+        stack.push(value)
+    result['list'] = (time.perf_counter() - start) / baseline_ops * 1e9
+    return result
+
+
+def bench_translate(n: int = 10_000_000, memory_size: int = 64 * BLOCK_SIZE) -> dict:
+    """
+    批量地址变换基准测试：对当前运行进程随机生成 n 个逻辑地址（含少量越界地址）进行变换。
+    另检查多级页表中末级页表已建立时，落入该页表的越界地址仍判为越界。
+    :return: 向量化变换总耗时（毫秒）、缺页数与越界数
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        lazy = ProcessManager(page_table_levels=2)
+        lazy.create_process('lazy', 1500 * BLOCK_SIZE)  # 第二个末级页表只含 476 项
+        lazy.access(lazy.running, 1400 * BLOCK_SIZE)
+        pm = ProcessManager()
+        pm.create_process('bench', memory_size)
+    _, fault, bounds = lazy.translate_many([1400 * BLOCK_SIZE, 1600 * BLOCK_SIZE, -1])
+    if fault.any() or bounds.tolist() != [False, True, True]:
+        raise AssertionError('多级页表越界判断错误！')
+    addrs = np.random.default_rng(42).integers(-BLOCK_SIZE, memory_size + BLOCK_SIZE, n)
+    start = time.perf_counter()
+    _, fault, bounds = pm.translate_many(addrs)
+    elapsed = time.perf_counter() - start
+    return {'ms': elapsed * 1e3, 'faults': int(fault.sum()), 'bounds': int(bounds.sum())}
+
+
+def bench_process_churn(n: int = 100_000, batch: int = 100) -> dict:
+    """
+    进程创建/结束吞吐量测试：每创建 batch 个进程后全部结束，检查在运行进程的进程号无重复。
+    :param n: 创建并结束的进程数
+    :param batch: 同时存在的进程数
+    :return: 每秒处理的进程数
+    """
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        pm = ProcessManager()
+        start = time.perf_counter()
+        for i in range(n):
+            pm.create_process(f'p{i}', BLOCK_SIZE)
+            if (i + 1) % batch == 0:
+                if len(pm.pid_index) != len(pm.processes):
+                    raise AssertionError('进程号重复！')
+                while pm.running:
+                    pm.terminate_process()
+        elapsed = time.perf_counter() - start
+    return {'per_sec': n / elapsed}
+
+
+def locality_trace(working_sets: dict, length: int, phase: int = 200, seed: int = 42,
+                   write_ratio: float = 0.0) -> list:
+    """
+    生成具有局部性的多进程访存序列：各进程轮流访问，每个进程在一个阶段内只访问其工作集中的页面，
+    每隔 phase 次访问工作集整体平移一次。
+    :param working_sets: 进程名 -> (进程页数, 工作集页数)
+    :param length: 序列长度
+    :param phase: 阶段长度
+    :param write_ratio: 偶数页被写的概率（奇数页只读），为0时不生成写标记
+    :return: [(进程名, 逻辑地址), ...] 或 [(进程名, 逻辑地址, 是否写), ...]
+    """
+    rng = random.Random(seed)
+    names = list(working_sets)
+    trace = []
+    for t in range(length):
+        name = names[t % len(names)]
+        pages, ws = working_sets[name]
+        base = (t // phase * ws) % max(pages - ws + 1, 1)
+        page_no = base + rng.randrange(ws)
+        addr = page_no * BLOCK_SIZE + rng.randrange(BLOCK_SIZE)
+        if write_ratio:
+            trace.append((name, addr, page_no % 2 == 0 and rng.random() < write_ratio))
+        else:
+            trace.append((name, addr))
+    return trace
+
+
+def scan_trace(sizes: dict, length: int, jump: float = 0.0, stride: int = BLOCK_SIZE // 4, seed: int = 42) -> list:
+    """
+    生成顺序扫描为主的多进程访存序列：各进程轮流以 stride 为步长循环扫描自己的地址空间，
+    每次访问以 jump 的概率跳到随机页面继续扫描。
+    :param sizes: 进程名 -> 进程页数
+    :param jump: 随机跳转的概率
+    :return: [(进程名, 逻辑地址), ...]
+    """
+    rng = random.Random(seed)
+    names = list(sizes)
+    cursor = dict.fromkeys(names, 0)
+    trace = []
+    for t in range(length):
+        name = names[t % len(names)]
+        limit = sizes[name] * BLOCK_SIZE
+        if rng.random() < jump:
+            cursor[name] = rng.randrange(sizes[name]) * BLOCK_SIZE
+        trace.append((name, cursor[name]))
+        cursor[name] = (cursor[name] + stride) % limit
+    return trace
+
+
+def replay_manager(sizes: dict, **options) -> ProcessManager:
+    """
+    构造访存回放实验用的 ProcessManager 并依次创建进程。创建前重置随机种子，使各次实验的初始内存占用相同。
+    :param sizes: 进程名 -> 进程页数
+    :param options: 传给 ProcessManager 的参数，即各次实验的不同之处，如 frame_allocator、policy、stats
+    :return: 已创建好进程的 ProcessManager
+    """
+    random.seed(42)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        pm = ProcessManager(**options)
+        for name, pages in sizes.items():
+            pm.create_process(name, pages * BLOCK_SIZE)
+    return pm
+
+
+def bench_frame_allocation(length: int = 20_000) -> dict:
+    """
+    比较固定分配、工作集与缺页频率三种内存块分配策略在多进程访存回放中的总缺页次数。
+    :return: 策略名 -> 总缺页次数
+    """
+    working_sets = {'A': (16, 8), 'B': (12, 2), 'C': (6, 1), 'D': (12, 5)}
+    trace = locality_trace(working_sets, length)
+    allocators = {
+        '固定分配': FrameAllocator('FIXED'),
+        '工作集': FrameAllocator('WS', window=40),
+        '缺页频率': FrameAllocator('PFF', window=40),
+        '缺页频率(全局)': FrameAllocator('PFF', 'GLOBAL', window=40),
+    }
+    sizes = {name: pages for name, (pages, _) in working_sets.items()}
+    return {label: replay_manager(sizes, frame_allocator=allocator).replay(trace)['faults']
+            for label, allocator in allocators.items()}
+
+
+def bench_dirty_replacement(length: int = 20_000, write_cost: float = 4.0) -> dict:
+    """
+    比较 FIFO、LRU 与改进型 CLOCK 算法在含写操作的访存回放中的缺页次数、脏页写回次数与I/O开销。
+    :param write_cost: 写出一页相对读入一页的开销
+    :return: 算法名 -> 换页统计
+    """
+    working_sets = {'A': (16, 6), 'B': (12, 4), 'C': (12, 5)}
+    trace = locality_trace(working_sets, length, phase=500, write_ratio=0.5)
+    sizes = {name: pages for name, (pages, _) in working_sets.items()}
+    result = {}
+    for policy in ('FIFO', 'LRU', 'CLOCK'):
+        res = replay_manager(sizes, policy=policy, stats=PagingStats(write_cost=write_cost)).replay(trace)
+        del res['per_process']
+        result[policy] = res
+    return result
+
+
+def bench_swap_io(frames: int = 1024, swap_slots: int = 16384, page_size: int = 4096, ops: int = 50_000,
+                  directory: str = None) -> dict:
+    """
+    置换区I/O基准测试：在内存映射的物理内存与置换区文件之间随机换入换出页面，最后刷写到磁盘。
+    :param directory: 映射文件所在目录，用于测试指定磁盘
+    :return: 换入换出的吞吐量与延迟分位数，以及刷盘耗时（毫秒）
+    """
+    rng = random.Random(42)
+    store = PageStore(frames, swap_slots, page_size, directory)
+    try:
+        for _ in range(ops):
+            block, address = rng.randrange(frames), rng.randrange(swap_slots)
+            if rng.random() < 0.5:
+                store.page_out(block, address)
+            else:
+                store.page_in(address, block)
+        start = time.perf_counter()
+        store.sync()
+        result = store.report()
+        result['sync_ms'] = (time.perf_counter() - start) * 1e3
+    finally:
+        store.close()
+    return result
+
+
+def bench_reclaim(length: int = 20_000, write_ratio: float = 0.5) -> dict:
+    """
+    比较有无后台页面回收器时缺页处理的延迟分布。全局置换下各进程的工作集之和超过物理内存，
+    无回收器时每次缺页都要同步淘汰（并写回）一页；有回收器时由 tick 在访存间隙提前回收。
+    :return: 配置名 -> 缺页次数、缺页延迟分位数（微秒）及回收次数
+    """
+    working_sets = {'A': (16, 8), 'B': (12, 6), 'C': (12, 6), 'D': (16, 8)}
+    trace = locality_trace(working_sets, length, write_ratio=write_ratio)
+    sizes = {name: pages for name, (pages, _) in working_sets.items()}
+    result = {}
+    for label, reclaimer in (('同步淘汰', None), ('后台回收', PageReclaimer())):
+        store = PageStore(BLOCK_NUM, BLOCK_NUM * 2, BLOCK_SIZE)
+        pm = replay_manager(sizes, frame_allocator=FrameAllocator('FIXED', 'GLOBAL'), page_store=store,
+                            reclaimer=reclaimer)
+        processes = {name: pm.processes[name] for name in working_sets}
+        latency = []
+        clock = time.perf_counter
+        try:
+            for name, addr, write in trace:
+                process = processes[name]
+                faults = process.faults
+                begin = clock()
+                pm.access(process, addr, write)
+                end = clock()
+                if process.faults != faults:
+                    latency.append(end - begin)
+                if reclaimer:
+                    reclaimer.tick(pm)
+        finally:
+            store.close()
+        p50, p99 = np.percentile(latency, [50, 99]) * 1e6
+        result[label] = {'faults': len(latency), 'p50': float(p50), 'p99': float(p99), 'max': max(latency) * 1e6,
+                         'reclaimed': reclaimer.reclaimed if reclaimer else 0}
+    return result
+
+
+def bench_readahead(length: int = 20_000) -> dict:
+    """
+    比较有无自适应顺序预读时，顺序扫描、偶有随机跳转与随机访问三种访存序列回放的缺页次数及预读的命中与浪费。
+    :return: 序列名 -> {'off': 无预读的缺页次数, 'on': 预读时的换页统计}
+    """
+    sizes = {'A': 18, 'B': 18, 'C': 18}
+    traces = {
+        '顺序扫描': scan_trace(sizes, length),
+        '偶有跳转': scan_trace(sizes, length, jump=0.02),
+        '随机访问': scan_trace(sizes, length, jump=1.0),
+    }
+    result = {}
+    for label, trace in traces.items():
+        res = {mode: replay_manager(sizes, frame_allocator=FrameAllocator('FIXED', 'GLOBAL'),
+                                    readahead=readahead).replay(trace)
+               for mode, readahead in (('off', None), ('on', Readahead()))}
+        result[label] = {'off': res['off']['faults'], 'on': res['on']}
+    return result
+
+
+def bench_telemetry(length: int = 50_000, intervals=(None, 1000, 100, 10)) -> dict:
+    """
+    测量遥测采样对访存回放速度的影响。
+    :param intervals: 依次测试的采样间隔，None 表示不采样
+    :return: 采样间隔 -> 每秒回放的访存次数与保存的采样数
+    """
+    working_sets = {'A': (16, 8), 'B': (12, 2), 'C': (6, 1), 'D': (12, 5)}
+    trace = locality_trace(working_sets, length)
+    sizes = {name: pages for name, (pages, _) in working_sets.items()}
+    result = {}
+    for interval in intervals:
+        telemetry = Telemetry(interval) if interval else None
+        pm = replay_manager(sizes, frame_allocator=FrameAllocator('PFF', 'GLOBAL', window=40), telemetry=telemetry)
+        start = time.perf_counter()
+        pm.replay(trace)
+        elapsed = time.perf_counter() - start
+        result[interval] = {'per_sec': length / elapsed, 'samples': len(telemetry.system) if telemetry else 0}
+    return result
+
+
+def bench_directory(n: int = 1_000_000, probes: int = 100_000) -> dict:
+    """
+    内存目录树基准测试：在同一目录下创建 n 个文件，再随机查找与删除其中 probes 个，最后列出目录。
+    :return: 各操作的单次耗时（微秒）
+    """
+    rng = random.Random(42)
+    names = [f'f{i}' for i in range(n)]
+    sample = rng.sample(names, probes)
+    fm = FileManager()
+    result = {}
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        for name in names:
+            fm.mk(name)
+        result['create'] = (time.perf_counter() - start) / n * 1e6
+        start = time.perf_counter()
+        for name in sample:
+            fm.cd(name)  # 查找后因不是目录而失败，只测查找开销
+        result['lookup'] = (time.perf_counter() - start) / probes * 1e6
+        start = time.perf_counter()
+        for name in sample:
+            fm.del_file(name)
+        result['delete'] = (time.perf_counter() - start) / probes * 1e6
+        start = time.perf_counter()
+        fm.dir()
+        result['list'] = (time.perf_counter() - start) / (n - probes) * 1e6
+    return result
+
+
+def bench_path_resolution(depth: int = 64, ops: int = 100_000) -> dict:
+    """
+    路径解析基准测试：在 depth 层深的目录下交替查找两个文件，比较目录项缓存命中与缓存容量为1（每次都逐级查找）时的耗时。
+    :return: 配置名 -> 单次解析耗时（微秒）
+    """
+    result = {}
+    for label, cache_size in (('缓存', 1024), ('无缓存', 1)):
+        fm = FileManager(cache_size)
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            for _ in range(depth):
+                fm.md('d')
+                fm.cd('d')
+            fm.mk('x')
+            fm.mk('y')
+        paths = [fm.cwd + ['x'], fm.cwd + ['y']]
+        start = time.perf_counter()
+        for i in range(ops):
+            fm._resolve(paths[i & 1])
+        result[label] = (time.perf_counter() - start) / ops * 1e6
+    return result
+
+
+def dangling_entries(path: str) -> list:
+    """
+    重新挂载虚盘，检查根目录中是否有 FCB 指向 FAT 表中的空闲块。
+    :return: 指向空闲块的文件名列表
+    """
+    fs = FATFileSystem(path)
+    dangling = []
+    for index in range(fs.dir_header(0)[1]):
+        block_no, offset = fs.entry_location(0, index)
+        name, _, first_block, _, _, _ = fs.parse_fcb(fs.block_view(block_no), offset)
+        if fs.is_free(first_block):
+            dangling.append(name)
+    fs.close()
+    return dangling
+
+
+def bench_fat_metadata(ops: int = 20_000, intervals=(1, 64)) -> dict:
+    """
+    FAT 元数据写入基准测试：在虚盘根目录中反复创建并删除文件，比较不同 FAT 表写回间隔下的耗时。
+    每种间隔下先检查删除文件后随即崩溃时，重新挂载的虚盘中没有 FCB 指向空闲块。
+    :param intervals: 依次测试的写回间隔（FAT 表修改项数），为 1 时即每次修改都写回
+    :return: 写回间隔 -> 每对创建/删除的耗时（微秒）
+    """
+    result = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for interval in intervals:
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                path = os.path.join(directory, f'bench{interval}.bin')
+                fs = FATFileSystem(path, fat_flush_interval=interval)
+                fs.mk('y', 3 * fs.block_size)
+                fs.sync()
+                fs.del_file('y')
+                fs.disk_file.flush()  # 只交出已写出的数据而不再写回，相当于删除后随即崩溃
+                if dangling_entries(path):
+                    raise AssertionError('删除后磁盘上的 FCB 指向空闲块！')
+                start = time.perf_counter()
+                for _ in range(ops):
+                    fs.mk('x', 1)
+                    fs.del_file('x')
+                fs.close()
+            result[interval] = (time.perf_counter() - start) / ops * 1e6
+    return result
+
+
+def bench_buffer_cache(ops: int = 5_000, sizes=(1, 64)) -> dict:
+    """
+    块缓冲区基准测试：在二级子目录中反复创建、列出并删除文件，比较不同缓冲区容量下的耗时与实际读写盘次数。
+    :param sizes: 依次测试的缓冲区容量（块数），为 1 时几乎每次访问都要读写盘
+    :return: 缓冲区容量 -> 单轮耗时（微秒）、命中率及读写盘次数
+    """
+    result = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                fs = FATFileSystem(os.path.join(directory, f'bench{size}.bin'), buffer_blocks=size)
+                fs.md('a')
+                fs.md('a/b')
+                start = time.perf_counter()
+                for _ in range(ops):
+                    fs.mk('a/b/x', 1)
+                    fs.dir('a/b')
+                    fs.del_file('a/b/x')
+                fs.close()
+            stats = fs.cache_stats()
+            result[size] = {'us': (time.perf_counter() - start) / ops * 1e6,
+                            'hit_rate': stats['hits'] / max(stats['hits'] + stats['misses'], 1),
+                            'disk_reads': stats['disk_reads'], 'disk_writes': stats['disk_writes']}
+    return result
+
+
+def bench_fcb_scan(ops: int = 200_000) -> dict:
+    """
+    目录块扫描基准测试：在装满 FCB 的根目录块中反复查找最后一项，比较块缓冲区模式与内存映射模式的耗时。
+    :return: 模式名 -> 单次查找耗时（微秒）
+    """
+    result = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for label, use_mmap in (('缓冲区', False), ('内存映射', True)):
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                fs = FATFileSystem(os.path.join(directory, f'{label}.bin'), use_mmap=use_mmap)
+                for i in range(7):
+                    fs.mk(f'f{i}', i)
+            start = time.perf_counter()
+            for _ in range(ops):
+                fs.find_entry(0, 'f6')
+            result[label] = (time.perf_counter() - start) / ops * 1e6
+            fs.close()
+    return result
+
+
+def bench_fat_directory(entries: int = 100_000, lookups: int = 20_000) -> dict:
+    """
+    大目录基准测试：在同一目录下创建 entries 个文件，随后随机查找并删除，统计单次耗时及每次查找的实际读盘次数。
+    目录沿 FAT 链扩展并带有磁盘上的哈希索引，块缓冲区只能容纳目录的一小部分。
+    :return: 'create' / 'lookup' / 'delete' -> 单次耗时（微秒），'reads' -> 每次查找的读盘次数
+    """
+    random.seed(42)
+    names = [f'f{i}' for i in range(entries)]
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            fs = FATFileSystem(os.path.join(directory, 'bench.bin'), block_size=4096, block_count=1 << 18)
+            fs.md('d')
+            block_no = fs._resolve(['d'])[0]
+            start = time.perf_counter()
+            for name in names:
+                fs.mk('d/' + name, 1)
+            create = (time.perf_counter() - start) / entries * 1e6
+            fs.flush_blocks()
+            reads = fs.disk_reads
+            start = time.perf_counter()
+            for name in random.choices(names, k=lookups):
+                fs.find_entry(block_no, name)
+            lookup = (time.perf_counter() - start) / lookups * 1e6
+            reads = (fs.disk_reads - reads) / lookups
+            start = time.perf_counter()
+            for name in random.sample(names, lookups):
+                fs.del_file('d/' + name)
+            delete = (time.perf_counter() - start) / lookups * 1e6
+            fs.close()
+    return {'create': create, 'lookup': lookup, 'delete': delete, 'reads': reads}
+
+
+def bench_file_stream(size: int = 64 << 20, chunks=(65536, 1000)) -> dict:
+    """
+    文件流式读写基准测试：按不同的块大小顺序写入再顺序读出 size 字节，与直接读写普通文件的吞吐量比较。
+    FAT 文件的写入经写合并缓冲按物理连续的区段写盘，顺序读取时预读窗口逐次加倍。
+    :param chunks: 依次测试的单次读写字节数，1000 字节时读写与块边界不对齐
+    :return: 单次读写字节数 -> {'fat_write', 'fat_read', 'raw_write', 'raw_read'}（MB/s）
+    """
+    payload = os.urandom(size)
+    result = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for chunk in chunks:
+            pieces = [payload[i:i + chunk] for i in range(0, size, chunk)]
+            res = {}
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                fs = FATFileSystem(os.path.join(directory, f'bench{chunk}.bin'), block_size=4096,
+                                   block_count=(size >> 12) + 1024)
+                fs.mk('data', 0)
+                start = time.perf_counter()
+                with fs.open('data') as file:
+                    for piece in pieces:
+                        file.write(piece)
+                fs.sync()
+                res['fat_write'] = size / (time.perf_counter() - start) / 1e6
+                start = time.perf_counter()
+                with fs.open('data') as file:
+                    data = b''.join(iter(lambda: file.read(chunk), b''))
+                res['fat_read'] = size / (time.perf_counter() - start) / 1e6
+                assert data == payload
+                fs.close()
+            path = os.path.join(directory, f'raw{chunk}.bin')
+            start = time.perf_counter()
+            with open(path, 'wb') as file:
+                for piece in pieces:
+                    file.write(piece)
+                file.flush()
+                os.fsync(file.fileno())
+            res['raw_write'] = size / (time.perf_counter() - start) / 1e6
+            start = time.perf_counter()
+            with open(path, 'rb') as file:
+                data = b''.join(iter(lambda: file.read(chunk), b''))
+            res['raw_read'] = size / (time.perf_counter() - start) / 1e6
+            result[chunk] = res
+    return result
+
+
+def bench_mount(rounds: int = 200) -> dict:
+    """
+    虚盘挂载基准测试：比较格式化新虚盘与依据超级块重新挂载已有虚盘的耗时，并确认重新挂载后目录内容仍在。
+    :return: 'format' / 'mount' -> 单次耗时（微秒），'persisted' -> 重新挂载后能否找到先前创建的文件
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.bin')
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            for _ in range(rounds):
+                if os.path.exists(path):
+                    os.remove(path)
+                FATFileSystem(path).close()
+            formatted = (time.perf_counter() - start) / rounds * 1e6
+            fs = FATFileSystem(path)
+            fs.mk('keep', 1)
+            fs.close()
+            start = time.perf_counter()
+            for _ in range(rounds):
+                fs = FATFileSystem(path)
+                fs.close()
+            mounted = (time.perf_counter() - start) / rounds * 1e6
+            fs = FATFileSystem(path)
+            persisted = fs.find_entry(0, 'keep') is not None
+            fs.close()
+    return {'format': formatted, 'mount': mounted, 'persisted': persisted}
+
+
+def bench_allocation(block_count: int = 1 << 18, churn: int = 2000, extents=(2, 4), rounds: int = 200) -> dict:
+    """
+    空闲块分配基准测试：在 block_count 块的虚盘上逐块分配直至写满，统计各填充阶段的平均分配耗时；
+    写满后随机释放 churn 个块再重新分配，测量空洞散布时的分配耗时；
+    最后再次随机释放 churn 个块，在几乎写满且碎片化的虚盘上分配多块，每次分配后立即释放以保持碎片状态。
+    :param extents: 依次测试的多块分配块数
+    :return: 填充比例 -> 单次分配耗时（微秒），'churn' -> 随机释放后的单次分配耗时，
+        'extent{块数}' -> 碎片化虚盘上的单次多块分配耗时
+    """
+    random.seed(42)
+    result = {}
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            fs = FATFileSystem(os.path.join(directory, 'bench.bin'), block_size=512, block_count=block_count)
+        step = (block_count - 1) // 10
+        for decile in range(1, 11):
+            start = time.perf_counter()
+            for _ in range(step):
+                fs.allocate_block()
+            result[f'{decile * 10}%'] = (time.perf_counter() - start) / step * 1e6
+        for block_no in random.sample(range(1, step * 10 + 1), churn):
+            fs.release_block_chain(block_no)
+        start = time.perf_counter()
+        for _ in range(churn):
+            fs.allocate_block()
+        result['churn'] = (time.perf_counter() - start) / churn * 1e6
+        for block_no in random.sample(range(1, step * 10 + 1), churn):
+            fs.release_block_chain(block_no)
+        for count in extents:
+            elapsed = 0.0
+            for _ in range(rounds):
+                start = time.perf_counter()
+                first_block = fs.allocate_blocks(count)
+                elapsed += time.perf_counter() - start
+                fs.release_block_chain(first_block)
+            result[f'extent{count}'] = elapsed / rounds * 1e6
+        fs.close()
+    return result
+
+
+def bench_event_replay(n: int = 200_000) -> dict:
+    """
+    进程状态机吞吐量测试：回放随机生成的创建、时间片到、阻塞、唤醒、结束及访存事件。
+    访存事件分布在各进程的全部页面上，回放中必然发生缺页。
+    """
+    random.seed(42)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        pm = ProcessManager()
+    report = EventDriver(pm).run(EventDriver.generate(n))
+    if not report['faults']:
+        raise AssertionError('事件回放未发生缺页！')
+    return report
+
+
+def bench_concurrency(threads=(1, 2, 4, 8), ops: int = 40_000, pages: int = 8) -> dict:
+    """
+    线程安全的进程管理器压力测试：各线程反复创建进程、对其随机访存（含写操作）后结束该进程，
+    所有线程结束后检查位示图恢复原状且存活进程的进程号无重复。
+    受 GIL 限制，多线程主要体现锁竞争的开销而非并行加速。
+    :param threads: 依次测试的线程数
+    :param ops: 每轮测试的总访存次数，平均分给各线程
+    :param pages: 每个进程的页数
+    :return: 线程数 -> 每秒访存次数
+    """
+    result = {}
+    for n in threads:
+        random.seed(42)
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            pm = ProcessManager(frame_allocator=FrameAllocator('FIXED', 'GLOBAL'), thread_safe=True)
+            bitmap = [bit.val for bit in pm.bitmap]
+            replace_bitmap = [bit.val for bit in pm.replace_bitmap]
+            errors = []
+
+            def worker(tid: int) -> None:
+                rng = random.Random(tid)
+                try:
+                    for k in range(ops // n // 100):
+                        name = f't{tid}-{k}'
+                        pm.create_process(name, pages * BLOCK_SIZE)
+                        process = pm.processes[name]
+                        for _ in range(100):
+                            pm.access(process, rng.randrange(pages * BLOCK_SIZE), rng.random() < 0.3)
+                        if len(pm.pid_index) != len(pm.processes):
+                            raise AssertionError('进程号重复！')
+                        pm.terminate_process(name)
+                except Exception as e:
+                    errors.append(e)
+
+            workers = [threading.Thread(target=worker, args=(tid,)) for tid in range(n)]
+            start = time.perf_counter()
+            for t in workers:
+                t.start()
+            for t in workers:
+                t.join()
+            elapsed = time.perf_counter() - start
+        if errors:
+            raise errors[0]
+        if [bit.val for bit in pm.bitmap] != bitmap or [bit.val for bit in pm.replace_bitmap] != replace_bitmap:
+            raise AssertionError('位示图未恢复！')
+        result[n] = ops // n // 100 * n * 100 / elapsed
+    return result
+
+
+if __name__ == '__main__':
+    res = bench_lru()
+    print(f"LRU栈（容量 1e5）: push {res['push']:.0f} ns/次, access_many {res['access_many']:.0f} ns/次, "
+          f"列表实现 {res['list']:.0f} ns/次, 缺页率 {res['miss_rate']:.2%}")
+    res = bench_translate()
+    print(f"批量地址变换（1e7 个地址）: {res['ms']:.1f} ms, 缺页 {res['faults']} 个, 越界 {res['bounds']} 个")
+    res = bench_process_churn()
+    print(f"进程创建/结束: {res['per_sec']:.0f} 个/秒")
+    res = bench_frame_allocation()
+    print('多进程访存回放总缺页次数: ' + ', '.join(f'{k} {v}' for k, v in res.items()))
+    for policy, res in bench_dirty_replacement().items():
+        print(f"{policy}: 缺页 {res['faults']}, 脏页写回 {res['swap_outs']}, 干净页丢弃 {res['clean_drops']}, "
+              f"I/O开销 {res['io_cost']:.0f}")
+    res = bench_swap_io()
+    for direction, label in (('in', '换入'), ('out', '换出')):
+        print(f"置换区{label}: {res[direction]['MB/s']:.0f} MB/s, p50 {res[direction]['p50']:.1f} μs, "
+              f"p99 {res[direction]['p99']:.1f} μs")
+    print(f"置换区刷盘: {res['sync_ms']:.1f} ms")
+    for label, res in bench_reclaim().items():
+        print(f"{label}: 缺页 {res['faults']}, 缺页延迟 p50 {res['p50']:.1f} μs, p99 {res['p99']:.1f} μs, "
+              f"max {res['max']:.1f} μs, 后台回收 {res['reclaimed']} 页")
+    for label, res in bench_readahead().items():
+        print(f"{label}: 缺页 {res['off']} -> {res['on']['faults']}, 预读 {res['on']['prefetches']} 页, "
+              f"命中 {res['on']['prefetch_hits']}, 浪费 {res['on']['prefetch_wasted']}")
+    print('遥测开销: ' + ', '.join(f"{'不采样' if k is None else f'每{k}次采样'} {v['per_sec']:.0f} 次/秒"
+                                 for k, v in bench_telemetry().items()))
+    res = bench_directory()
+    print(f"目录（1e6 项）: 创建 {res['create']:.2f} μs/次, 查找 {res['lookup']:.2f} μs/次, "
+          f"删除 {res['delete']:.2f} μs/次, 列目录 {res['list']:.2f} μs/项")
+    res = bench_path_resolution()
+    print(f"64 层路径解析: 目录项缓存 {res['缓存']:.2f} μs/次, 逐级查找 {res['无缓存']:.2f} μs/次")
+    print('FAT 创建/删除文件: ' + ', '.join(f'每{k}项写回 {v:.1f} μs/次' for k, v in bench_fat_metadata().items()))
+    for size, res in bench_buffer_cache().items():
+        print(f"块缓冲区 {size} 块: {res['us']:.1f} μs/轮, 命中率 {res['hit_rate']:.2%}, "
+              f"读盘 {res['disk_reads']} 次, 写盘 {res['disk_writes']} 次")
+    res = bench_fcb_scan()
+    print(f"目录块查找: 缓冲区 {res['缓冲区']:.2f} μs/次, 内存映射 {res['内存映射']:.2f} μs/次")
+    res = bench_fat_directory()
+    print(f"FAT 目录 10 万项: 创建 {res['create']:.1f} μs/次, 查找 {res['lookup']:.1f} μs/次 "
+          f"(读盘 {res['reads']:.2f} 次), 删除 {res['delete']:.1f} μs/次")
+    for chunk, res in bench_file_stream().items():
+        print(f"FAT 文件流式读写（每次 {chunk} 字节）: 写 {res['fat_write']:.0f} MB/s, 读 {res['fat_read']:.0f} MB/s; "
+              f"普通文件 写 {res['raw_write']:.0f} MB/s, 读 {res['raw_read']:.0f} MB/s")
+    res = bench_mount()
+    print(f"虚盘启动: 格式化 {res['format']:.1f} μs/次, 挂载 {res['mount']:.1f} μs/次, 重启后数据保留 {res['persisted']}")
+    print('逐块分配至写满: ' + ', '.join(f'{k} {v:.2f} μs/次' for k, v in bench_allocation().items()))
+    print('进程事件回放:\n' + EventDriver.format_report(bench_event_replay()))
+    print('多线程访存吞吐量: ' + ', '.join(f'{k} 线程 {v:.0f} 次/秒' for k, v in bench_concurrency().items()))
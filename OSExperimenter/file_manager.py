@@ -9,8 +9,38 @@
 * Function: OS实验三 文件与磁盘管理
 """
 import os
+import itertools
+import re
+import mmap
 import struct
+import zlib
+from array import array
 from datetime import datetime
+import numpy as np
+from util import LRUCache, PathCache
+
+
+def split_path(path, cwd=()):
+    """
+    将路径规范化为从根目录开始的名称列表。以 / 或 \\ 分隔，以分隔符开头为绝对路径，
+    否则相对于 cwd；. 表示当前目录，.. 表示上一级（根目录的上一级仍为根目录）。
+    :param path: 路径
+    :param cwd: 当前目录的名称列表
+    :return: 名称列表
+    """
+    parts = [] if path.startswith(('/', '\\')) else list(cwd)
+    for name in re.split(r'[\\/]', path):
+        if name == '..':
+            if parts:
+                parts.pop()
+        elif name and name != '.':
+            parts.append(name)
+    return parts
+
+
+def join_path(parts):
+    """将名称列表拼接为以 / 开头的绝对路径，作为目录项缓存的键"""
+    return '/' + '/'.join(parts)
 
 
 class FCB:
@@ -23,347 +53,1169 @@ class FCB:
         self.file_type = file_type  # 文件类型：DIR 或 FILE
         self.time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")  # 创建时间
         self.next = None  # 下一个兄弟节点
-        self.child = None  # 孩子节点
+        self.prev = None  # 上一个兄弟节点
+        self.child = None  # 孩子节点（第一个孩子）
+        self.tail = None  # 最后一个孩子
+        self.children = {} if file_type == "DIR" else None  # 目录的孩子名称索引：名称 -> FCB
         self.parent = None  # 父节点
 
     def is_dir(self):
         return self.file_type == "DIR"
 
+    def __iter__(self):
+        """按创建顺序遍历目录的孩子"""
+        child = self.child
+        while child:
+            yield child
+            child = child.next
+
 
 class FileManager:
-    def __init__(self):
+    def __init__(self, cache_size=1024):
         self.root = FCB("root", "DIR")  # 根目录
         self.current_dir = self.root
+        self.cwd = []  # 当前目录的路径（从根目录开始的名称列表）
+        self.dcache = PathCache(cache_size)  # 目录项缓存：规范化的绝对路径 -> FCB
 
-    def md(self, name):
+    def md(self, path):
         """创建目录"""
-        if self._find(name):
-            print(f"Directory '{name}' already exists.")
+        parent, name = self._resolve_parent(path)
+        if parent is None:
+            print(f"Cannot create directory '{path}'. Parent directory not found.")
+            return
+        if name in parent.children:
+            print(f"Directory '{path}' already exists.")
             return
-        new_dir = FCB(name, "DIR")
-        new_dir.parent = self.current_dir
-        self.insert_child(new_dir)
-        print(f"Directory '{name}' created.")
+        self.insert_child(FCB(name, "DIR"), parent)
+        print(f"Directory '{path}' created.")
 
-    def mk(self, name, size=0):
+    def mk(self, path, size=0):
         """创建文件"""
-        if self._find(name):
-            print(f"File '{name}' already exists.")
+        parent, name = self._resolve_parent(path)
+        if parent is None:
+            print(f"Cannot create file '{path}'. Parent directory not found.")
             return
-        new_file = FCB(name, "FILE", size)
-        new_file.parent = self.current_dir
-        self.insert_child(new_file)
-        print(f"File '{name}' created.")
-
-    def cd(self, name):
-        """切换目录"""
-        if name == "..":
-            if self.current_dir.parent:
-                self.current_dir = self.current_dir.parent
+        if name in parent.children:
+            print(f"File '{path}' already exists.")
             return
-        target = self._find(name)
-        if target and target.is_directory():
+        self.insert_child(FCB(name, "FILE", size), parent)
+        print(f"File '{path}' created.")
+
+    def cd(self, path):
+        """切换目录，支持绝对路径、相对路径及 . 和 .."""
+        parts = split_path(path, self.cwd)
+        target = self._resolve(parts)
+        if target and target.is_dir():
             self.current_dir = target
+            self.cwd = parts
         else:
-            print(f"Directory '{name}' not found.")
+            print(f"Directory '{path}' not found.")
 
-    def rd(self, name):
-        """删除目录"""
-        target = self._find(name)
-        if target and target.is_directory() and not target.child:
+    def rd(self, path):
+        """删除空目录"""
+        parts = split_path(path, self.cwd)
+        target = self._resolve(parts)
+        if target and target.is_dir() and not target.child and parts and self.cwd[:len(parts)] != parts:
             self.remove_child(target)
-            print(f"Directory '{name}' removed.")
+            self.dcache.invalidate(join_path(parts))
+            print(f"Directory '{path}' removed.")
         else:
-            print(f"Cannot remove directory '{name}'. It may not be empty or does not exist.")
+            print(f"Cannot remove directory '{path}'. It may not be empty or does not exist.")
 
-    def del_file(self, name):
+    def del_file(self, path):
         """删除文件"""
-        target = self._find(name)
-        if target and not target.is_directory():
+        parts = split_path(path, self.cwd)
+        target = self._resolve(parts)
+        if target and not target.is_dir():
             self.remove_child(target)
-            print(f"File '{name}' deleted.")
+            self.dcache.invalidate(join_path(parts), subtree=False)
+            print(f"File '{path}' deleted.")
         else:
-            print(f"File '{name}' not found.")
-
-    def dir(self):
-        """列出当前目录内容"""
-        child = self.current_dir.child
-        if not child:
+            print(f"File '{path}' not found.")
+
+    def ren(self, path, new_name):
+        """重命名文件或目录（不移动位置），目录改名后其下所有路径的缓存一并失效"""
+        parts = split_path(path, self.cwd)
+        target = self._resolve(parts)
+        if not target or not parts:
+            print(f"'{path}' not found.")
+            return
+        if not new_name or '/' in new_name or '\\' in new_name or new_name in target.parent.children:
+            print(f"Cannot rename '{path}' to '{new_name}'.")
+            return
+        children = target.parent.children
+        del children[target.name]
+        target.name = new_name
+        children[new_name] = target
+        self.dcache.invalidate(join_path(parts), subtree=target.is_dir())
+        if self.cwd[:len(parts)] == parts:  # 当前目录位于被改名的目录之下
+            self.cwd[len(parts) - 1] = new_name
+        print(f"'{path}' renamed to '{new_name}'.")
+
+    def dir(self, path=None):
+        """列出当前目录（或指定目录）内容"""
+        directory = self.current_dir if path is None else self._resolve(split_path(path, self.cwd))
+        if not directory or not directory.is_dir():
+            print(f"Directory '{path}' not found.")
+            return
+        if not directory.child:
             print("Directory is empty.")
             return
-        while child:
+        for child in directory:
             print(f"{child.name} ({'DIR' if child.is_dir() else 'FILE'}, "
                   f"{child.size}B) - Created at {child.time}")
-            child = child.next
 
     # 辅助方法
     def _find(self, name):
-        """在当前目录下查找文件或目录"""
-        child = self.current_dir.child
-        while child:
-            if child.name == name:
-                return child
-            child = child.next
-        return None
-
-    def insert_child(self, node):
-        """将节点插入到当前目录的孩子链表中"""
-        if not self.current_dir.child:
-            self.current_dir.child = node
+        """在当前目录下查找文件或目录（哈希索引，O(1)）"""
+        return self.current_dir.children.get(name)
+
+    def _resolve(self, parts):
+        """
+        按规范化路径查找节点，先查目录项缓存，未命中时从根目录逐级查找并缓存结果
+        :param parts: 从根目录开始的名称列表
+        :return: FCB，不存在时返回 None
+        """
+        if not parts:
+            return self.root
+        key = join_path(parts)
+        node = self.dcache.get(key)
+        if node is None:
+            node = self.root
+            for name in parts:
+                if not node.is_dir():
+                    return None
+                node = node.children.get(name)
+                if node is None:
+                    return None
+            self.dcache.put(key, node)
+        return node
+
+    def _resolve_parent(self, path):
+        """
+        查找路径的父目录与最后一级名称，用于创建
+        :return: (父目录 FCB, 名称)，父目录不存在或名称为空时父目录为 None
+        """
+        parts = split_path(path, self.cwd)
+        if not parts:
+            return None, ''
+        parent = self._resolve(parts[:-1])
+        if parent is None or not parent.is_dir():
+            return None, parts[-1]
+        return parent, parts[-1]
+
+    def insert_child(self, node, directory=None):
+        """将节点追加到目录（默认为当前目录）的孩子链表尾部，并加入名称索引"""
+        directory = directory or self.current_dir
+        node.parent = directory
+        node.prev, node.next = directory.tail, None
+        if directory.tail:
+            directory.tail.next = node
         else:
-            child = self.current_dir.child
-            while child.next:
-                child = child.next
-            child.next = node
+            directory.child = node
+        directory.tail = node
+        directory.children[node.name] = node
 
     def remove_child(self, node):
-        """从当前目录的孩子链表中移除节点"""
-        if self.current_dir.child == node:
-            self.current_dir.child = node.next
+        """从所在目录的孩子链表及名称索引中移除节点"""
+        directory = node.parent
+        if node.prev:
+            node.prev.next = node.next
+        else:
+            directory.child = node.next
+        if node.next:
+            node.next.prev = node.prev
         else:
-            prev = self.current_dir.child
-            while prev and prev.next != node:
-                prev = prev.next
-            if prev:
-                prev.next = node.next
+            directory.tail = node.prev
+        node.prev = node.next = None
+        del directory.children[node.name]
 
 
-# 定义块大小和块数
+# 格式化新虚盘时默认的块大小和块数，已有虚盘以超级块中记录的几何参数为准
 BLOCK_SIZE = 256
 BLOCK_COUNT = 8
 DISK_FILE = "virtual_disk.bin"
-
-# FAT表特殊标记
+SUPERBLOCK_MAGIC = b"OSFATFS3"
+SUPERBLOCK_STRUCT = struct.Struct("<8sIIIIIII")  # 魔数、块大小、块数、FAT表偏移、FAT表项字节数、数据区偏移、空闲块数、空闲块提示
+SUPERBLOCK_SIZE = 64  # 超级块保留区大小，FAT表紧随其后，数据区从FAT表之后的下一个块边界开始
+FCB_SIZE = 32  # FCB大小
+FCB_STRUCT = struct.Struct("<8sIIHxxIQ")  # 名称、大小、起始块号、类型、父目录块号、创建时间（YYYYMMDDHHMMSS）
+EMPTY_FCB = bytes(FCB_SIZE)
+DIR_MAGIC = b"DIR1"
+DIR_HEADER = struct.Struct("<4sIIII")  # 目录头（占目录首块的第一个FCB槽位）：魔数、父目录块号、目录项数、索引块链起始块号（0表示无索引）、索引槽数
+INDEX_SLOT = struct.Struct("<II")  # 目录索引槽：名称哈希、目录项序号+1（0表示空槽）
+
+# FAT表特殊标记，链尾标记为表项各位全1（16位表项为 0xFFFF，32位表项为 0xFFFFFFFF）
 EMPTY_BLOCK = 0x0000
-LAST_BLOCK = 0xFFFF
+
+# 空闲块位示图按64位字组织
+WORD_BITS = 64
+FULL_WORD = (1 << WORD_BITS) - 1
+MAP_GROUP_WORDS = 1024  # 位示图按组懒建立，每组1024个字（65536块）
 
 
 # 定义FAT表和虚盘文件
 class FATFileSystem:
-    def __init__(self):
-        self.fat = [EMPTY_BLOCK] * BLOCK_COUNT  # 初始化FAT表
-        self.disk_file = open(DISK_FILE, "wb+")
-        self.init_disk()
+    def __init__(self, path=DISK_FILE, cache_size=1024, fat_flush_interval=64, buffer_blocks=64, use_mmap=False,
+                 block_size=BLOCK_SIZE, block_count=BLOCK_COUNT, chain_cache_size=256):
+        """
+        :param path: 虚盘文件路径
+        :param cache_size: 目录项缓存容量
+        :param fat_flush_interval: FAT 表累计修改多少项后自动写回磁盘，为 1 时每次修改都立即写回
+        :param buffer_blocks: 块缓冲区容量（块数），内存映射模式下不使用
+        :param use_mmap: 是否以内存映射方式访问虚盘，此时块以 memoryview 直接暴露，由操作系统页缓存负责缓存与写回
+        :param block_size: 格式化时的块大小（字节），须为FCB大小的整数倍
+        :param block_count: 格式化时的块数，不少于 0xFFFF 块时FAT表改用32位表项
+        :param chain_cache_size: 块链缓存容量（块链数），缓存目录、目录索引及文件的块号列表，
+            至少应能同时容纳正在操作的目录及其索引的块链，否则每次操作都要沿FAT表重新遍历
+        """
+        if chain_cache_size < 2:
+            raise ValueError("Chain cache must hold at least 2 chains.")
+        if block_size < FCB_SIZE or block_size % FCB_SIZE:
+            raise ValueError(f"Block size must be a positive multiple of {FCB_SIZE} bytes.")
+        if not 0 < block_count < 0xFFFFFFFF:
+            raise ValueError("Block count must be between 1 and 0xFFFFFFFE.")
+        self.set_geometry(block_size, block_count)
+        self.fat = array(self.fat_type)  # FAT表，常驻内存并以写回方式落盘
+        self.fat_dirty = None  # FAT 表中尚未写回的表项范围 [起始, 结束)
+        self.fat_updates = 0  # 上次写回后修改的表项数
+        self.fat_freed = False  # 上次写回后是否有块被释放，释放的表项须等脏块写回后才能写回
+        self.fat_linked = None  # 上次写回后被设为非空闲值、尚未写回的表项范围 [起始, 结束)
+        self.fat_flush_interval = fat_flush_interval
+        self.path = path
+        self.buffer = LRUCache(buffer_blocks, on_evict=self._evict_block)  # 块缓冲区：块号 -> bytearray
+        self.dirty_blocks = set()  # 缓冲区中被修改、尚未写回的块号
+        self.disk_reads = 0  # 实际读盘次数
+        self.disk_writes = 0  # 实际写盘次数
+        self.map = self.view = None  # 内存映射模式下的虚盘映射及其 memoryview
+        self.chains = LRUCache(chain_cache_size)  # 目录、目录索引及文件的块链缓存：起始块号 -> 块号列表
+        self.free_blocks = 0  # 空闲块数，随超级块持久化
+        self.free_hint = 0  # 最小的可能空闲块号，其前的块均已占用，随超级块持久化
+        self.free_map = array("Q")  # 空闲块位示图，置位表示占用，按组在首次使用时由FAT表建立
+        self.map_ready = bytearray()  # 位示图各组是否已建立
+        # 已有虚盘直接挂载，不再截断重建；只有缺少超级块魔数时才格式化
+        self.disk_file = open(path, "r+b" if os.path.exists(path) else "w+b")
+        if not self.mount():
+            self.init_disk()
+        if use_mmap:
+            self.disk_file.flush()  # 先清空文件对象的写缓冲，避免其在关闭时覆盖映射中的修改
+            self.map = mmap.mmap(self.disk_file.fileno(), 0)
+            self.view = memoryview(self.map)
         self.current_directory = 0  # 根目录起始块号
+        self.cwd = []  # 当前目录的路径（从根目录开始的名称列表）
+        self.dcache = PathCache(cache_size)  # 目录项缓存：规范化的绝对路径 -> (起始块号, 类型)
         self.create_time = datetime.now().strftime("%Y/%m/%d %H:%M")
 
+    def set_geometry(self, block_size, block_count, fat_offset=SUPERBLOCK_SIZE, data_offset=None):
+        """
+        设置虚盘的几何参数：块数少于 0xFFFF 时FAT表使用16位表项，否则使用32位表项
+        :param data_offset: 数据区偏移，缺省时取FAT表末尾之后的下一个块边界
+        """
+        self.block_size = block_size
+        self.block_count = block_count
+        self.fat_type = "H" if block_count < 0xFFFF else "I"
+        self.last_block = (1 << array(self.fat_type).itemsize * 8) - 1
+        self.fat_offset = fat_offset
+        if data_offset is None:
+            fat_end = fat_offset + block_count * array(self.fat_type).itemsize
+            data_offset = -(-fat_end // block_size) * block_size
+        self.data_offset = data_offset
+
     def init_disk(self):
-        """初始化虚盘文件和根目录"""
-        # 创建FAT表和空块
-        if os.path.getsize(DISK_FILE) < BLOCK_SIZE * BLOCK_COUNT:
-            # 设置根目录块为占用状态
-            self.fat[0] = LAST_BLOCK
-            # 初始化空块
-            for _ in range(BLOCK_COUNT):
-                self.disk_file.write(b'\x00' * BLOCK_SIZE)
-            self.write_fat()
-            print("Disk initialized with FAT table and root directory.")
+        """格式化虚盘：写入超级块、FAT表和空块，并建立根目录"""
+        self.fat = array(self.fat_type, bytes(self.block_count * array(self.fat_type).itemsize))
+        # 设置根目录块为占用状态
+        self.fat[0] = self.last_block
+        self.free_blocks = self.block_count - 1
+        self.free_hint = 1
+        self.reset_free_map()
+        # 以截断方式一次性建立全零的FAT表区域与空块
+        self.disk_file.truncate(0)
+        self.disk_file.truncate(self.data_offset + self.block_size * self.block_count)
+        self._write_disk(0, self.directory_block(0))
+        self.write_fat()
+        print("Disk initialized with FAT table and root directory.")
 
-    def write_fat(self):
-        """将FAT表写入虚盘的前16字节"""
+    def mount(self):
+        """
+        根据超级块挂载已有虚盘，FAT表一次性读入内存，空闲块数与分配提示直接取自超级块而不扫描
+        :return: 虚盘带有合法超级块并挂载成功时为 True，需要格式化时为 False
+        """
         self.disk_file.seek(0)
-        for entry in self.fat:
-            self.disk_file.write(struct.pack("H", entry))
+        raw = self.disk_file.read(SUPERBLOCK_STRUCT.size)
+        if len(raw) < SUPERBLOCK_STRUCT.size:
+            return False
+        magic, block_size, block_count, fat_offset, entry_size, data_offset, free_blocks, free_hint = \
+            SUPERBLOCK_STRUCT.unpack(raw)
+        if magic != SUPERBLOCK_MAGIC:
+            return False
+        self.set_geometry(block_size, block_count, fat_offset, data_offset)
+        self.fat = array(self.fat_type)
+        if self.fat.itemsize != entry_size:
+            raise ValueError(f"Unsupported FAT entry size: {entry_size} bytes.")
+        if os.fstat(self.disk_file.fileno()).st_size < data_offset + block_size * block_count:
+            raise ValueError("Disk image is truncated.")
+        self.disk_file.seek(fat_offset)
+        self.fat.fromfile(self.disk_file, block_count)
+        self.free_blocks = free_blocks
+        self.free_hint = free_hint
+        self.reset_free_map()
+        print(f"Disk mounted with {free_blocks} free blocks.")
+        return True
+
+    def reset_free_map(self):
+        """
+        清空空闲块位示图，各组留待分配时首次用到才由FAT表建立，挂载时不扫描FAT表。
+        每个64位字对应64个块。
+        """
+        words = -(-len(self.fat) // WORD_BITS)
+        self.free_map = array("Q", bytes(words * self.free_map.itemsize))
+        self.map_ready = bytearray(-(-words // MAP_GROUP_WORDS))
+
+    def _build_group(self, group):
+        """由FAT表建立位示图的一组字，末字中超出块数的位视为占用，保证不会被分配"""
+        start = group * MAP_GROUP_WORDS * WORD_BITS
+        end = min(len(self.fat), start + MAP_GROUP_WORDS * WORD_BITS)
+        words = -(-(end - start) // WORD_BITS)
+        used = np.ones(words * WORD_BITS, dtype=bool)
+        used[:end - start] = np.frombuffer(self.fat, dtype=self.fat.typecode)[start:end] != EMPTY_BLOCK
+        first = group * MAP_GROUP_WORDS
+        self.free_map[first:first + words] = array("Q", np.packbits(used, bitorder="little").tobytes())
+        self.map_ready[group] = 1
+
+    def free_word(self, word):
+        """位示图中的一个字，所在的组尚未建立时先由FAT表建立"""
+        if not self.map_ready[word // MAP_GROUP_WORDS]:
+            self._build_group(word // MAP_GROUP_WORDS)
+        return self.free_map[word]
+
+    def superblock(self):
+        """打包当前的超级块内容"""
+        return SUPERBLOCK_STRUCT.pack(SUPERBLOCK_MAGIC, self.block_size, self.block_count, self.fat_offset,
+                                      self.fat.itemsize, self.data_offset, self.free_blocks, self.free_hint)
+
+    def write_fat(self):
+        """将整个FAT表连同超级块写入虚盘"""
+        self.fat_dirty = (0, len(self.fat))
+        self.flush_fat()
+
+    def set_fat(self, block_no, value):
+        """修改一个FAT表项并记录脏范围，累计修改达到写回间隔时写回"""
+        if (self.fat[block_no] == EMPTY_BLOCK) != (value == EMPTY_BLOCK):
+            word, bit = divmod(block_no, WORD_BITS)
+            ready = self.map_ready[word // MAP_GROUP_WORDS]  # 尚未建立的组日后由FAT表建立，无需维护
+            if value == EMPTY_BLOCK:
+                if ready:
+                    self.free_map[word] &= ~(1 << bit)
+                self.free_blocks += 1
+                self.free_hint = min(self.free_hint, block_no)
+                self.fat_freed = True
+            else:
+                if ready:
+                    self.free_map[word] |= 1 << bit
+                self.free_blocks -= 1
+        self.fat[block_no] = value
+        if self.fat_dirty is None:
+            self.fat_dirty = (block_no, block_no + 1)
+        else:
+            self.fat_dirty = (min(self.fat_dirty[0], block_no), max(self.fat_dirty[1], block_no + 1))
+        if value != EMPTY_BLOCK:
+            if self.fat_linked is None:
+                self.fat_linked = (block_no, block_no + 1)
+            else:
+                self.fat_linked = (min(self.fat_linked[0], block_no), max(self.fat_linked[1], block_no + 1))
+        self.fat_updates += 1
+        if self.fat_updates >= self.fat_flush_interval:
+            self.flush_fat()
+
+    def flush_fat(self):
+        """
+        将FAT表的脏范围一次性写回磁盘，并更新超级块中的空闲块数与分配提示。
+        其中有释放的表项而缓冲区中尚有脏块时，改为连同脏块一起按序写回（见 flush_blocks），
+        避免删除后磁盘上的目录项仍指向已标记为空闲的块
+        """
+        if self.fat_dirty is None:
+            return
+        if self.fat_freed and self.dirty_blocks:
+            self.flush_blocks()
+            return
+        start, end = self.fat_dirty
+        self._write_raw(self.fat_offset + start * self.fat.itemsize, self.fat[start:end].tobytes())
+        self._write_raw(0, self.superblock())
+        self.fat_dirty = self.fat_linked = None
+        self.fat_updates = 0
+        self.fat_freed = False
+
+    def _write_fat_links(self):
+        """
+        有块被释放而脏块尚未写回时，只写回被设为非空闲值的表项，其中的空闲表项暂按链尾写回，
+        使脏块引用的新分配块在磁盘上标记为占用，而释放的块在磁盘上仍保持占用
+        """
+        if self.fat_linked is None:
+            return
+        start, end = self.fat_linked
+        entries = self.fat[start:end]
+        values = np.frombuffer(entries, dtype=entries.typecode)
+        values[values == EMPTY_BLOCK] = self.last_block
+        self._write_raw(self.fat_offset + start * self.fat.itemsize, entries.tobytes())
+        self.fat_linked = None
+
+    def flush_blocks(self):
+        """
+        按块号顺序写回缓冲区中的全部脏块，并与FAT表按序写回：先写回FAT表，保证目录项引用的块在磁盘上已标记为占用；
+        有块被释放时，释放的表项留到脏块写回后再写回，保证磁盘上的目录项、索引项不会指向空闲块
+        """
+        if self.fat_freed and self.dirty_blocks:
+            self._write_fat_links()
+        else:
+            self.flush_fat()
+        for block_no in sorted(self.dirty_blocks):
+            self._write_disk(block_no, self.buffer.data[block_no])
+        self.dirty_blocks.clear()
+        self.flush_fat()
+
+    def sync(self):
+        """写回FAT表与缓冲区中的脏块，并将虚盘内容刷写到磁盘"""
+        self.flush_blocks()
+        if self.map is not None:
+            self.map.flush()
+        else:
+            self.disk_file.flush()
+            os.fsync(self.disk_file.fileno())
 
     def allocate_block(self):
-        """分配一个空闲块"""
-        for i in range(BLOCK_COUNT):  # 从块1开始查找
-            if self.fat[i] == EMPTY_BLOCK:
-                self.fat[i] = LAST_BLOCK
-                self.write_fat()
-                return i
+        """
+        分配一个空闲块：从分配提示所在的字开始逐字查找，跳过已占满的字，取字内最低的空闲位。
+        分配提示只在释放块时后退，每个占满的字在两次释放之间至多被跳过一次，因此分配的均摊开销为 O(1)。
+        """
+        if self.free_blocks:
+            start = self.free_hint // WORD_BITS
+            for word in itertools.chain(range(start, len(self.free_map)), range(start)):
+                free = ~self.free_word(word) & FULL_WORD
+                if free:
+                    block_no = word * WORD_BITS + (free & -free).bit_length() - 1
+                    self.free_hint = block_no + 1
+                    self.set_fat(block_no, self.last_block)
+                    return block_no
         raise RuntimeError("No free blocks available.")
 
+    def find_extent(self, count):
+        """
+        从分配提示处查找连续 count 个空闲块，查到末尾后回绕到虚盘开头，与 allocate_block 一致。
+        按组用 numpy 筛出可能含有足够长空闲区的字（字内有足够长的空闲位段，或与相邻字在边界处都空闲），
+        只逐字检查这些字：字内低位的空闲位接续上一字末尾的空闲区，字内的空闲位段用移位与运算查找，
+        字内高位的空闲位开始新的空闲区
+        :return: 连续空闲区的起始块号，不存在时返回 None
+        """
+        first = self.free_hint // WORD_BITS
+        below_hint = (1 << (self.free_hint % WORD_BITS)) - 1  # 首次查找时首字中分配提示以下的位视为占用
+        for low, high, mask in ((first, len(self.free_map), below_hint), (0, first + 1, 0)):
+            start = length = 0
+            previous = None
+            for group in range(low // MAP_GROUP_WORDS, -(-high // MAP_GROUP_WORDS)):
+                if not self.map_ready[group]:
+                    self._build_group(group)
+                begin, end = max(low, group * MAP_GROUP_WORDS), min(high, (group + 1) * MAP_GROUP_WORDS)
+                words = np.frombuffer(self.free_map, dtype=np.uint64, count=end - begin,
+                                      offset=begin * self.free_map.itemsize)
+                for word in (np.flatnonzero(self._extent_candidates(words, count)) + begin).tolist():
+                    used = self.free_map[word]
+                    if word == first:
+                        used |= mask
+                    if word != previous:
+                        length = 0  # 与上一个含空闲位的字不相邻，空闲区中断
+                    previous = word + 1
+                    if not used:
+                        if not length:
+                            start = word * WORD_BITS
+                        length += WORD_BITS
+                        if length >= count:
+                            return start
+                        continue
+                    if length and length + (used & -used).bit_length() - 1 >= count:
+                        return start
+                    if count <= WORD_BITS:
+                        runs, width = ~used & FULL_WORD, 1  # runs 中置位的位表示自该位起 width 个块均空闲
+                        while width < count and runs:
+                            shift = min(width, count - width)
+                            runs &= runs >> shift
+                            width += shift
+                        if runs:
+                            return word * WORD_BITS + (runs & -runs).bit_length() - 1
+                    start, length = word * WORD_BITS + used.bit_length(), WORD_BITS - used.bit_length()
+        return None
+
+    @staticmethod
+    def _extent_candidates(words, count):
+        """
+        筛出一段位示图字中可能属于长为 count 的空闲区的字：字内有足够长的空闲位段（count 超过一字时为整字空闲），
+        或最高位空闲且下一字最低位空闲（及其下一字）；这段字首尾的字与段外相邻字的关系未知，按边界空闲保守保留
+        """
+        if count <= WORD_BITS:
+            runs, width = ~words, 1
+            while width < count:
+                shift = min(width, count - width)
+                runs &= runs >> np.uint64(shift)
+                width += shift
+            keep = runs != 0
+        else:
+            keep = words == 0
+        low_free = (words & np.uint64(1)) == 0
+        high_free = (words >> np.uint64(WORD_BITS - 1)) == 0
+        joined = high_free[:-1] & low_free[1:]
+        keep[:-1] |= joined
+        keep[1:] |= joined
+        keep[0] |= low_free[0]
+        keep[-1] |= high_free[-1]
+        return keep
+
+    def is_free(self, block_no):
+        """块是否空闲"""
+        return not self.free_word(block_no // WORD_BITS) >> (block_no % WORD_BITS) & 1
+
+    def allocate_blocks(self, count, after=None):
+        """
+        分配 count 个块并在FAT表中链接成块链，优先分配连续区，找不到足够长的连续区时退化为逐块分配
+        :param after: 若其后紧接的 count 个块均空闲则优先使用，使文件追加的块与原有的块物理连续
+        :return: 块链的起始块号
+        """
+        if count > self.free_blocks:
+            raise RuntimeError("No free blocks available.")
+        if after is not None and after + count < self.block_count and \
+                all(self.is_free(block_no) for block_no in range(after + 1, after + count + 1)):
+            start = after + 1
+        else:
+            start = self.find_extent(count)
+        if start is None:
+            blocks = [self.allocate_block() for _ in range(count)]
+        else:
+            blocks = range(start, start + count)
+            if start == self.free_hint:
+                self.free_hint = start + count
+        for block_no, next_block in zip(blocks, blocks[1:]):
+            self.set_fat(block_no, next_block)
+        self.set_fat(blocks[-1], self.last_block)
+        return blocks[0]
+
     def release_block_chain(self, start_block):
         """释放一个块链表（文件或目录占用的所有块）"""
-        while start_block != LAST_BLOCK:
+        self.chains.pop(start_block)
+        while start_block != self.last_block:
             next_block = self.fat[start_block]
-            self.fat[start_block] = EMPTY_BLOCK
+            self.set_fat(start_block, EMPTY_BLOCK)
             start_block = next_block
-        self.write_fat()
 
-    def write_block(self, block_no, data):
-        """将数据写入指定块的空闲区域"""
-        if len(data) != 32:
-            raise ValueError("Data must be exactly 32 bytes to fit in a file control block.")
+    def _write_raw(self, offset, data):
+        """在虚盘的指定偏移处写入数据"""
+        if self.map is not None:
+            self.map[offset:offset + len(data)] = data
+        else:
+            self.disk_file.seek(offset)
+            self.disk_file.write(data)
+        self.disk_writes += 1
 
+    def _read_disk(self, block_no):
+        """从虚盘读取一块（不经过缓冲区），文件末尾不足一块时补零"""
         # 计算块位置并跳过FAT表区域
-        self.disk_file.seek(block_no * BLOCK_SIZE + 16)
-        current_data = self.disk_file.read(BLOCK_SIZE)
-
-        # 查找块内的第一个空闲32字节位置
-        for i in range(0, BLOCK_SIZE, 32):
-            if current_data[i:i + 32] == b'\x00' * 32:  # 空闲区域
-                self.disk_file.seek(block_no * BLOCK_SIZE + 16 + i)
-                self.disk_file.write(data)
-                return
-
-        raise ValueError("No free space in the block to write data.")
+        self.disk_file.seek(block_no * self.block_size + self.data_offset)
+        self.disk_reads += 1
+        return bytearray(self.disk_file.read(self.block_size).ljust(self.block_size, b'\x00'))
+
+    def _write_disk(self, block_no, data):
+        """将一块写入虚盘（不经过缓冲区）"""
+        self._write_raw(block_no * self.block_size + self.data_offset, data)
+
+    def _evict_block(self, block_no, data):
+        """缓冲区淘汰块时的回调，脏块需先写回；有块被释放时释放的表项暂不写回，留待其余脏块写回后再写回"""
+        if block_no in self.dirty_blocks:
+            self.dirty_blocks.discard(block_no)
+            if self.fat_freed:
+                self._write_fat_links()
+            else:
+                self.flush_fat()
+            self._write_disk(block_no, data)
+
+    def _buffer_block(self, block_no):
+        """取得块在缓冲区中的副本，未命中时读盘"""
+        data = self.buffer.get(block_no)
+        if data is None:
+            data = self._read_disk(block_no)
+            self.buffer.put(block_no, data)
+        return data
+
+    def block_view(self, block_no):
+        """
+        取得块内容的 memoryview，可直接读取或原地修改（修改后须调用 mark_dirty），不拷贝数据。
+        内存映射模式下为虚盘映射的切片，否则为块缓冲区中的副本。
+        """
+        if self.view is not None:
+            start = block_no * self.block_size + self.data_offset
+            return self.view[start:start + self.block_size]
+        return memoryview(self._buffer_block(block_no))
+
+    def mark_dirty(self, block_no):
+        """标记块已被原地修改，内存映射模式下由操作系统负责写回"""
+        if self.view is None:
+            self.dirty_blocks.add(block_no)
+
+    def read_at(self, block_no, offset, size):
+        """读取块内指定偏移处的数据（副本）"""
+        return bytes(self.block_view(block_no)[offset:offset + size])
+
+    def write_at(self, block_no, offset, data):
+        """原地写入块内指定偏移处的数据并标记脏块"""
+        self.block_view(block_no)[offset:offset + len(data)] = data
+        self.mark_dirty(block_no)
 
     def write_block2(self, block_no, data):
         """将数据写入指定块"""
-        if len(data) != BLOCK_SIZE:
-            raise ValueError(f"Data must be exactly {BLOCK_SIZE} bytes to fit in a block.")
+        if len(data) != self.block_size:
+            raise ValueError(f"Data must be exactly {self.block_size} bytes to fit in a block.")
 
-        # 定位到块的起始位置，并写入整个块的数据
-        self.disk_file.seek(block_no * BLOCK_SIZE + 16)
-        self.disk_file.write(data)
+        if self.view is not None:
+            self.block_view(block_no)[:] = data
+        else:
+            # 整块覆盖，无需先读盘
+            self.buffer.put(block_no, bytearray(data))
+            self.dirty_blocks.add(block_no)
 
     def read_block(self, block_no):
-        """读取指定块的数据"""
-        self.disk_file.seek(block_no * BLOCK_SIZE + 16)
-        return self.disk_file.read(BLOCK_SIZE)
+        """读取指定块的数据（副本）"""
+        return bytes(self.block_view(block_no))
+
+    def cache_stats(self):
+        """块缓冲区的命中、未命中次数及实际读写盘次数"""
+        return {'hits': self.buffer.hits, 'misses': self.buffer.misses, 'dirty': len(self.dirty_blocks),
+                'disk_reads': self.disk_reads, 'disk_writes': self.disk_writes}
 
     @staticmethod
     def create_fcb(name, size, file_type, first_block, parent_block):
-        """创建32字节的FCB结构（文件控制块），增加parent_block字段"""
-        datetime_str = datetime.now().strftime("%Y%m%d%H%M%S")
-        fcb_data = struct.pack("8sIHHH14s", name.encode(), size, first_block, file_type, parent_block,
-                               datetime_str.encode())
+        """创建32字节的FCB结构（文件控制块），增加parent_block字段，块号均为32位"""
+        stamp = int(datetime.now().strftime("%Y%m%d%H%M%S"))
+        fcb_data = FCB_STRUCT.pack(name.encode(), size, first_block, file_type, parent_block, stamp)
         return fcb_data
 
     @staticmethod
-    def parse_fcb(fcb_data):
-        """解析32字节的FCB结构"""
-        name, size, first_block, file_type, parent_block, datetime_str = struct.unpack("8sIHHH14s", fcb_data)
-        return name.decode().strip('\x00'), size, first_block, file_type, parent_block, datetime_str.decode().strip(
-            '\x00')
+    def parse_fcb(fcb_data, offset=0):
+        """
+        解析32字节的FCB结构
+        :param fcb_data: FCB 数据，或包含 FCB 的整块数据（bytes 或 memoryview）
+        :param offset: FCB 在 fcb_data 中的偏移，直接从原缓冲区解析而不切片
+        """
+        name, size, first_block, file_type, parent_block, stamp = FCB_STRUCT.unpack_from(fcb_data, offset)
+        return name.decode().strip('\x00'), size, first_block, file_type, parent_block, str(stamp)
+
+    def directory_block(self, parent_block):
+        """构造空目录的首块：第一个FCB槽位为目录头，其余槽位存放目录项"""
+        data = bytearray(self.block_size)
+        DIR_HEADER.pack_into(data, 0, DIR_MAGIC, parent_block, 0, 0, 0)
+        return data
+
+    def dir_header(self, block_no):
+        """
+        读取目录头
+        :return: (父目录块号, 目录项数, 索引块链起始块号, 索引槽数)
+        """
+        magic, parent_block, count, index_head, buckets = DIR_HEADER.unpack_from(self.block_view(block_no))
+        if magic != DIR_MAGIC:
+            raise ValueError(f"Block {block_no} is not a directory.")
+        return parent_block, count, index_head, buckets
+
+    def chain(self, start_block):
+        """块链中的全部块号，沿内存中的FAT表获得并缓存，按序号访问目录项或索引槽时无需逐块跟随"""
+        blocks = self.chains.get(start_block)
+        if blocks is None:
+            blocks = []
+            block_no = start_block
+            while block_no != self.last_block:
+                blocks.append(block_no)
+                block_no = self.fat[block_no]
+            self.chains.put(start_block, blocks)
+        return blocks
+
+    def entry_location(self, dir_block, index):
+        """目录中第 index 个目录项所在的块号及块内偏移，目录项在块链中连续存放"""
+        blocks, slot = divmod(index + 1, self.block_size // FCB_SIZE)
+        return self.chain(dir_block)[blocks], slot * FCB_SIZE
+
+    def _slot_location(self, index_head, slot):
+        """索引槽所在的块号及块内偏移"""
+        blocks, slot = divmod(slot, self.block_size // INDEX_SLOT.size)
+        return self.chain(index_head)[blocks], slot * INDEX_SLOT.size
+
+    def _probe(self, index_head, buckets, key_hash):
+        """从哈希对应的槽位开始线性探测，依次产生 (槽位, 哈希, 目录项序号+1)，产生第一个空槽后结束"""
+        slot = key_hash & (buckets - 1)
+        while True:
+            block_no, offset = self._slot_location(index_head, slot)
+            stored, loc = INDEX_SLOT.unpack_from(self.block_view(block_no), offset)
+            yield slot, stored, loc
+            if not loc:
+                return
+            slot = (slot + 1) & (buckets - 1)
+
+    def _index_put(self, index_head, slot, key_hash, index):
+        """写入一个索引槽，index 为 None 时清空该槽"""
+        block_no, offset = self._slot_location(index_head, slot)
+        self.write_at(block_no, offset, INDEX_SLOT.pack(key_hash, 0 if index is None else index + 1))
+
+    def _index_insert(self, index_head, buckets, key_hash, index):
+        """把目录项序号插入索引中的第一个空槽"""
+        for slot, _, loc in self._probe(index_head, buckets, key_hash):
+            if not loc:
+                self._index_put(index_head, slot, key_hash, index)
+                return
+
+    def _index_find(self, index_head, buckets, key_hash, index):
+        """查找指向指定目录项的索引槽"""
+        for slot, _, loc in self._probe(index_head, buckets, key_hash):
+            if loc == index + 1:
+                return slot
+        raise ValueError(f"Directory index is missing entry {index}.")
+
+    def _index_delete(self, index_head, buckets, key_hash, index):
+        """删除指向指定目录项的索引槽，并把其后同一探测序列中的槽位前移填补空洞，无需墓碑标记"""
+        mask = buckets - 1
+        hole = slot = self._index_find(index_head, buckets, key_hash, index)
+        while True:
+            slot = (slot + 1) & mask
+            block_no, offset = self._slot_location(index_head, slot)
+            stored, loc = INDEX_SLOT.unpack_from(self.block_view(block_no), offset)
+            if not loc:
+                break
+            if (slot - (stored & mask)) & mask >= (slot - hole) & mask:  # 空洞位于该槽的探测路径上
+                self._index_put(index_head, hole, stored, loc - 1)
+                hole = slot
+        self._index_put(index_head, hole, 0, None)
+
+    def _rebuild_index(self, dir_block, count, old_head):
+        """
+        为目录的前 count 项重建索引：槽数取不小于 4 * (count + 1) 的2的幂，在内存中填好整张表后整块写入新分配的连续块，
+        之后装载率超过 1/2 时再次重建，因此重建的开销均摊到每次插入为 O(1)
+        :return: (新索引块链起始块号, 索引槽数)
+        """
+        slots_per_block = self.block_size // INDEX_SLOT.size
+        buckets = max(slots_per_block, 1 << (4 * (count + 1) - 1).bit_length())
+        table = bytearray(-(-buckets // slots_per_block) * self.block_size)
+        mask = buckets - 1
+        for index in range(count):
+            block_no, offset = self.entry_location(dir_block, index)
+            key_hash = zlib.crc32(self.read_at(block_no, offset, 8))
+            slot = key_hash & mask
+            while INDEX_SLOT.unpack_from(table, slot * INDEX_SLOT.size)[1]:
+                slot = (slot + 1) & mask
+            INDEX_SLOT.pack_into(table, slot * INDEX_SLOT.size, key_hash, index + 1)
+        head = self.allocate_blocks(len(table) // self.block_size)
+        for i, block_no in enumerate(self.chain(head)):
+            self.write_block2(block_no, table[i * self.block_size:(i + 1) * self.block_size])
+        if old_head:
+            self.release_block_chain(old_head)
+        return head, buckets
+
+    def add_entry(self, dir_block, fcb_data):
+        """
+        在目录末尾追加一个FCB：末块写满时沿FAT链为目录追加一块，目录超过一块后建立哈希索引并随之维护
+        """
+        parent_block, count, index_head, buckets = self.dir_header(dir_block)
+        per_block = self.block_size // FCB_SIZE
+        blocks = self.chain(dir_block)
+        if (count + 1) // per_block == len(blocks):
+            block_no = self.allocate_block()
+            self.write_block2(block_no, bytes(self.block_size))
+            self.set_fat(blocks[-1], block_no)
+            blocks.append(block_no)
+        if (count + 1) * 2 > buckets if index_head else count + 1 >= per_block:
+            index_head, buckets = self._rebuild_index(dir_block, count, index_head)
+        self.write_at(*self.entry_location(dir_block, count), fcb_data)
+        if index_head:
+            self._index_insert(index_head, buckets, zlib.crc32(fcb_data[:8]), count)
+        self.write_at(dir_block, 0, DIR_HEADER.pack(DIR_MAGIC, parent_block, count + 1, index_head, buckets))
+
+    def remove_entry(self, dir_block, index):
+        """删除目录中的第 index 项：把最后一项移入空位，保持目录项连续存放"""
+        parent_block, count, index_head, buckets = self.dir_header(dir_block)
+        block_no, offset = self.entry_location(dir_block, index)
+        last_block, last_offset = self.entry_location(dir_block, count - 1)
+        if index_head:
+            self._index_delete(index_head, buckets, zlib.crc32(self.read_at(block_no, offset, 8)), index)
+        if index != count - 1:
+            moved = self.read_at(last_block, last_offset, FCB_SIZE)
+            self.write_at(block_no, offset, moved)
+            if index_head:
+                key_hash = zlib.crc32(moved[:8])
+                self._index_put(index_head, self._index_find(index_head, buckets, key_hash, count - 1), key_hash, index)
+        self.write_at(last_block, last_offset, EMPTY_FCB)
+        self.write_at(dir_block, 0, DIR_HEADER.pack(DIR_MAGIC, parent_block, count - 1, index_head, buckets))
+
+    @staticmethod
+    def runs(blocks):
+        """把块号序列划分为物理连续的区段，依次产生 (起始块号, 块数)"""
+        i = 0
+        while i < len(blocks):
+            j = i + 1
+            while j < len(blocks) and blocks[j] == blocks[j - 1] + 1:
+                j += 1
+            yield blocks[i], j - i
+            i = j
+
+    def read_run(self, block_no, count):
+        """
+        一次读入物理连续的 count 块，不经过块缓冲区以免大文件冲掉目录块；缓冲区中已有的块以缓冲区内容为准
+        :return: 读入的数据（bytearray 或 memoryview）
+        """
+        start, length = block_no * self.block_size + self.data_offset, count * self.block_size
+        if self.view is not None:
+            return self.view[start:start + length]
+        self.disk_file.seek(start)
+        data = bytearray(self.disk_file.read(length).ljust(length, b'\x00'))
+        self.disk_reads += 1
+        cached = self.buffer.data
+        for cached_block in (cached if len(cached) < count else range(block_no, block_no + count)):
+            if block_no <= cached_block < block_no + count and cached_block in cached:
+                offset = (cached_block - block_no) * self.block_size
+                data[offset:offset + self.block_size] = cached[cached_block]
+        return data
+
+    def write_run(self, block_no, data):
+        """一次写入物理连续的若干整块，不经过块缓冲区，缓冲区中这些块的旧副本一并丢弃"""
+        start = block_no * self.block_size + self.data_offset
+        if self.view is not None:
+            self.view[start:start + len(data)] = data
+            return
+        count = len(data) // self.block_size
+        cached = self.buffer.data
+        for cached_block in [b for b in (cached if len(cached) < count else range(block_no, block_no + count))
+                             if block_no <= b < block_no + count and b in cached]:
+            self.buffer.pop(cached_block)
+            self.dirty_blocks.discard(cached_block)
+        self._write_raw(start, data)
+
+    def read_range(self, first_block, pos, size):
+        """读取文件块链中 [pos, pos + size) 的内容，物理连续的块一次读入"""
+        if size <= 0:
+            return b""
+        blocks = self.chain(first_block)[pos // self.block_size:-(-(pos + size) // self.block_size)]
+        data = b"".join(self.read_run(block_no, count) for block_no, count in self.runs(blocks))
+        skip = pos % self.block_size
+        return data[skip:skip + size]
+
+    def write_range(self, first_block, pos, data, size):
+        """
+        把数据写入文件块链的 [pos, pos + len(data))：块链不够长时紧接链尾按需追加块，
+        首尾不足一块的部分先读出原内容再合并，之后按物理连续的区段整段写盘
+        :param size: 写入前的文件大小，末块中超出文件大小的部分没有有效内容，无需读出
+        """
+        if not data:
+            return
+        first, end = pos // self.block_size, -(-(pos + len(data)) // self.block_size)
+        blocks = self.chain(first_block)
+        if end > len(blocks):
+            head = self.allocate_blocks(end - len(blocks), after=blocks[-1])
+            self.set_fat(blocks[-1], head)
+            blocks.extend(self.chain(head))
+            self.chains.pop(head)
+        head_pad = pos - first * self.block_size
+        tail_pad = end * self.block_size - pos - len(data)
+        if head_pad or tail_pad:
+            merged = bytearray((end - first) * self.block_size)
+            if head_pad:
+                merged[:head_pad] = self.read_run(blocks[first], 1)[:head_pad]
+            if tail_pad and pos + len(data) < size:
+                merged[-tail_pad:] = self.read_run(blocks[end - 1], 1)[self.block_size - tail_pad:]
+            merged[head_pad:head_pad + len(data)] = data
+            data = merged
+        data = memoryview(data)
+        offset = 0
+        for block_no, count in self.runs(blocks[first:end]):
+            self.write_run(block_no, data[offset:offset + count * self.block_size])
+            offset += count * self.block_size
+
+    def truncate_chain(self, first_block, size):
+        """释放文件块链中 size 字节之后不再需要的块，至少保留首块"""
+        keep = max(1, -(-size // self.block_size))
+        blocks = self.chain(first_block)
+        if len(blocks) > keep:
+            self.set_fat(blocks[keep - 1], self.last_block)
+            self.release_block_chain(blocks[keep])
+            del blocks[keep:]
+
+    def set_file_size(self, parts, size):
+        """更新文件 FCB 中记录的大小"""
+        parent_block = self._resolve(parts[:-1])[0]
+        index, (name, _, first_block, file_type, _, stamp) = self.find_entry(parent_block, parts[-1], 1)
+        self.write_at(*self.entry_location(parent_block, index),
+                      FCB_STRUCT.pack(name.encode(), size, first_block, file_type, parent_block, int(stamp)))
+
+    def open(self, path, readahead_blocks=64, coalesce_blocks=64):
+        """
+        打开文件
+        :param readahead_blocks: 顺序读时预读窗口的上限（块数）
+        :param coalesce_blocks: 写合并缓冲累计到多少块后写盘
+        :return: FATFile，文件不存在时返回 None
+        """
+        parts = split_path(path, self.cwd)
+        entry = self._resolve(parts)
+        if entry is None or entry[1] != 1:
+            print(f"File '{path}' not found.")
+            return None
+        size = self.find_entry(self._resolve(parts[:-1])[0], parts[-1], 1)[1][1]
+        return FATFile(self, parts, entry[0], size, readahead_blocks, coalesce_blocks)
+
+    def read_file(self, path):
+        """读取整个文件的内容，文件不存在时返回 None"""
+        file = self.open(path)
+        if file is None:
+            return None
+        with file:
+            return file.read()
+
+    def write_file(self, path, data, append=False):
+        """覆盖或追加写入文件内容，文件不存在时先创建"""
+        if self._resolve(split_path(path, self.cwd)) is None and self._create(path, 0, 1) is None:
+            return
+        file = self.open(path)
+        if file is None:
+            return
+        try:
+            with file:
+                if append:
+                    file.seek(file.size)
+                else:
+                    file.truncate(0)
+                file.write(data)
+        except RuntimeError:
+            print(f"Cannot write '{path}'. Not enough free blocks.")
+            return
+        print(f"{len(data)} bytes written to '{path}'.")
+
+    def truncate_file(self, path, size):
+        """截断或以零扩展文件到指定大小"""
+        file = self.open(path)
+        if file is None:
+            return
+        try:
+            with file:
+                file.truncate(size)
+        except RuntimeError:
+            print(f"Cannot truncate '{path}'. Not enough free blocks.")
+            return
+        print(f"File '{path}' truncated to {size} bytes.")
 
-    def md(self, name):
+    def md(self, path):
         """创建目录，记录父目录块号"""
-        block_no = self.allocate_block()
-        fcb = self.create_fcb(name, BLOCK_SIZE, 2, block_no, self.current_directory)
-        self.write_block(self.current_directory, fcb)
-        print(f"Directory '{name}' created at block {block_no}.")
+        created = self._create(path, self.block_size, 2)
+        if created is not None:
+            print(f"Directory '{path}' created at block {created}.")
 
-    def mk(self, name, size):
+    def mk(self, path, size):
         """创建文件"""
-        # 获取当前目录的父块号
-        data = self.read_block(self.current_directory)
-        fcb_data = data[:32]  # 假设当前目录的第一个FCB记录了父目录信息
-        _, _, _, _, parent_block, _ = self.parse_fcb(fcb_data)
-
-        # 分配块并创建文件的FCB，使用当前目录的父块号
-        block_no = self.allocate_block()
-        fcb = self.create_fcb(name, size, 1, block_no, parent_block=parent_block)
-
-        # 将文件的FCB写入当前目录的块
-        self.write_block(self.current_directory, fcb)
-        print(f"File '{name}' created with size {size} bytes at block {block_no}.")
-
-    def cd(self, name):
-        """切换目录，支持cd ..返回上一级"""
-        if name == "..":  # 返回上一级目录
-            if self.current_directory == 0:
-                print("Already at the root directory.")
-                return
-            # 获取当前目录的父块号
-            data = self.read_block(self.current_directory)
-            fcb_data = data[:32]  # 假设第一个 FCB 是当前目录的 FCB
-            _, _, _, _, parent_block, _ = self.parse_fcb(fcb_data)
-            self.current_directory = parent_block
-            print("Moved up to the parent directory.")
+        created = self._create(path, size, 1)
+        if created is not None:
+            print(f"File '{path}' created with size {size} bytes at block {created}.")
+
+    def _create(self, path, size, file_type):
+        """
+        在路径的父目录中创建文件或目录的 FCB
+        :return: 分配的块号，失败时返回 None
+        """
+        parts = split_path(path, self.cwd)
+        parent = self._resolve(parts[:-1]) if parts else None
+        if parent is None or parent[1] != 2:
+            print(f"Cannot create '{path}'. Parent directory not found.")
+            return None
+        name = parts[-1]
+        if not 0 < len(name.encode()) <= 8:
+            print(f"Invalid name '{name}'. Names must be 1 to 8 bytes long.")
+            return None
+        if self.find_entry(parent[0], name) is not None:
+            print(f"'{path}' already exists.")
+            return None
+        count = max(1, -(-size // self.block_size)) if file_type == 1 else 1  # 文件按大小预留连续的块
+        if count > self.free_blocks:
+            print(f"Cannot create '{path}'. Not enough free blocks.")
+            return None
+        block_no = self.allocate_blocks(count)
+        if file_type == 2:
+            self.write_block2(block_no, self.directory_block(parent[0]))
         else:
-            # 查找当前目录中的子目录
-            block_no = self.find_block_by_name(name, file_type=2)
-            if block_no is not None:
-                self.current_directory = block_no
-                print(f"Changed directory to '{name}' (block {block_no}).")
-            else:
-                print(f"Directory '{name}' not found.")
+            self.write_range(block_no, 0, bytes(size), 0)  # 新文件的内容为全零
+        try:
+            self.add_entry(parent[0], self.create_fcb(name, size, file_type, block_no, parent[0]))
+        except RuntimeError:  # 父目录扩展或重建索引时空间不足
+            self.release_block_chain(block_no)
+            print(f"Cannot create '{path}'. Not enough free blocks.")
+            return None
+        return block_no
+
+    def cd(self, path):
+        """切换目录，支持绝对路径、相对路径及 . 和 .."""
+        parts = split_path(path, self.cwd)
+        entry = self._resolve(parts)
+        if entry is not None and entry[1] == 2:
+            self.current_directory = entry[0]
+            self.cwd = parts
+            print(f"Changed directory to '{join_path(parts)}' (block {entry[0]}).")
+        else:
+            print(f"Directory '{path}' not found.")
 
-    def rd(self, name):
+    def rd(self, path):
         """删除空目录"""
         # 找到目录的块号
-        block_no = self.find_block_by_name(name, file_type=2)
-        if block_no is None:
-            print(f"Directory '{name}' not found.")
+        parts = split_path(path, self.cwd)
+        entry = self._resolve(parts)
+        if entry is None or entry[1] != 2 or not parts:
+            print(f"Directory '{path}' not found.")
+            return
+        if self.cwd[:len(parts)] == parts:
+            print(f"Cannot remove '{path}'. It is the current directory or one of its parents.")
             return
 
         # 检查目录是否为空
-        data = self.read_block(block_no)
-        if any(data[i:i + 32].strip(b'\x00') for i in range(0, BLOCK_SIZE, 32)):
-            print(f"Directory '{name}' is not empty.")
+        _, count, index_head, _ = self.dir_header(entry[0])
+        if count:
+            print(f"Directory '{path}' is not empty.")
             return
 
-        # 释放目录块的 FAT 表记录
-        self.release_block_chain(block_no)
-
-        # 从父目录块中删除该目录的 FCB 信息
-        parent_block_no = self.get_parent_block_no(block_no)
-        if parent_block_no is not None:
-            self.remove_fcb_from_directory(parent_block_no, name, file_type=2)
+        # 先从父目录块中删除该目录的 FCB 信息，再释放目录块的 FAT 表记录，
+        # 使尚未写回的 FAT 表在任何时刻至多多占用块，而不会出现 FCB 指向空闲块
+        self.remove_fcb_from_directory(self._resolve(parts[:-1])[0], parts[-1], file_type=2)
+        self.release_block_chain(entry[0])
+        if index_head:
+            self.release_block_chain(index_head)
+        self.dcache.invalidate(join_path(parts))
 
-        print(f"Directory '{name}' deleted.")
-
-    def get_parent_block_no(self, block_no):
-        """获取指定目录的父块号"""
-        data = self.read_block(block_no)
-        fcb_data = data[:32]  # 假设第一个 FCB 记录了当前目录的元信息
-        _, _, _, _, parent_block, _ = self.parse_fcb(fcb_data)
-        return parent_block
+        print(f"Directory '{path}' deleted.")
 
     def remove_fcb_from_directory(self, parent_block_no, name, file_type):
         """从父目录中删除指定名称和类型的 FCB 记录"""
-        data = self.read_block(parent_block_no)
-        new_data = bytearray(data)
-
-        for i in range(0, BLOCK_SIZE, 32):
-            fcb_data = data[i:i + 32]
-            if fcb_data.strip(b'\x00'):
-                fcb_name, _, _, fcb_type, _, _ = self.parse_fcb(fcb_data)
-                if fcb_name == name and fcb_type == file_type:
-                    # 清空该 FCB 记录
-                    new_data[i:i + 32] = b'\x00' * 32
-                    break
-
-        # 将更新后的数据写回父目录块
-        self.write_block2(parent_block_no, bytes(new_data))
-
-    def del_file(self, name):
+        found = self.find_entry(parent_block_no, name, file_type)
+        if found is None:
+            return
+        self.remove_entry(parent_block_no, found[0])
+
+    def del_file(self, path):
         """删除文件"""
         # 找到文件的块号
-        block_no = self.find_block_by_name(name, file_type=1)
-        if block_no is None:
-            print(f"File '{name}' not found.")
+        parts = split_path(path, self.cwd)
+        entry = self._resolve(parts)
+        if entry is None or entry[1] != 1:
+            print(f"File '{path}' not found.")
             return
 
-        # 释放文件块的 FAT 表记录
-        self.release_block_chain(block_no)
+        # 先从父目录块中删除该文件的 FCB 信息，再释放文件块的 FAT 表记录
+        self.remove_fcb_from_directory(self._resolve(parts[:-1])[0], parts[-1], file_type=1)
+        self.release_block_chain(entry[0])
+        self.dcache.invalidate(join_path(parts), subtree=False)
 
-        # 从父目录块中删除该文件的 FCB 信息
-        self.remove_fcb_from_directory(self.current_directory, name, file_type=1)
+        print(f"File '{path}' deleted.")
 
-        print(f"File '{name}' deleted.")
-
-    def dir(self):
-        """列出当前目录内容，格式化输出"""
-        data = self.read_block(self.current_directory)
+    def ren(self, path, new_name):
+        """重命名文件或目录（不移动位置），目录改名后其下所有路径的缓存一并失效"""
+        parts = split_path(path, self.cwd)
+        entry = self._resolve(parts)
+        if entry is None or not parts:
+            print(f"'{path}' not found.")
+            return
+        parent_block = self._resolve(parts[:-1])[0]
+        if not 0 < len(new_name.encode()) <= 8 or '/' in new_name or '\\' in new_name:
+            print(f"Invalid name '{new_name}'. Names must be 1 to 8 bytes long.")
+            return
+        if self.find_entry(parent_block, new_name) is not None:
+            print(f"'{new_name}' already exists.")
+            return
+        index, _ = self.find_entry(parent_block, parts[-1], entry[1])
+        block_no, offset = self.entry_location(parent_block, index)
+        _, _, index_head, buckets = self.dir_header(parent_block)
+        old_key, new_key = self.read_at(block_no, offset, 8), new_name.encode().ljust(8, b'\x00')
+        if index_head:
+            self._index_delete(index_head, buckets, zlib.crc32(old_key), index)
+        self.write_at(block_no, offset, new_key)
+        if index_head:
+            self._index_insert(index_head, buckets, zlib.crc32(new_key), index)
+        self.dcache.invalidate(join_path(parts), subtree=entry[1] == 2)
+        if self.cwd[:len(parts)] == parts:  # 当前目录位于被改名的目录之下
+            self.cwd[len(parts) - 1] = new_name
+        print(f"'{path}' renamed to '{new_name}'.")
+
+    def dir(self, path=None):
+        """列出当前目录（或指定目录）内容，格式化输出"""
+        if path is None:
+            block_no = self.current_directory
+        else:
+            entry = self._resolve(split_path(path, self.cwd))
+            if entry is None or entry[1] != 2:
+                print(f"Directory '{path}' not found.")
+                return
+            block_no = entry[0]
         print(f"{self.create_time}    <DIR>    .")
         print(f"{self.create_time}    <DIR>    ..")
 
-        for i in range(0, len(data), 32):
-            fcb_data = data[i:i + 32]
-            if fcb_data.strip(b'\x00'):  # 过滤空的 FCB 数据
-                name, size, first_block, file_type, _, datetime_str = self.parse_fcb(fcb_data)
-                type_str = "<DIR>" if file_type == 2 else "     "
-                size_str = "" if file_type == 2 else f"{size} B"
-                date_time = datetime.strptime(datetime_str, "%Y%m%d%H%M%S")
-                date_str = date_time.strftime('%Y/%m/%d %H:%M') if isinstance(date_time, datetime) else datetime_str
-
-                # 输出每一行信息
-                print(f"{date_str}    {type_str}    {name:<15} {size_str}")
+        for index in range(self.dir_header(block_no)[1]):
+            entry_block, offset = self.entry_location(block_no, index)
+            name, size, first_block, file_type, _, datetime_str = self.parse_fcb(
+                self.block_view(entry_block), offset)
+            type_str = "<DIR>" if file_type == 2 else "     "
+            size_str = "" if file_type == 2 else f"{size} B"
+            date_time = datetime.strptime(datetime_str, "%Y%m%d%H%M%S")
+            date_str = date_time.strftime('%Y/%m/%d %H:%M') if isinstance(date_time, datetime) else datetime_str
+
+            # 输出每一行信息
+            print(f"{date_str}    {type_str}    {name:<15} {size_str}")
+
+    def find_entry(self, block_no, name, file_type=None):
+        """
+        在目录中查找指定名称（及类型）的 FCB：有索引时按名称哈希探测，只比较哈希相同的目录项，
+        否则目录只有一块，直接比较各项的名称字段，只解析匹配的 FCB
+        :return: (目录项序号, 解析后的 FCB)，不存在时返回 None
+        """
+        key = name.encode().ljust(8, b'\x00')
+        _, count, index_head, buckets = self.dir_header(block_no)
+        if not index_head:
+            view = self.block_view(block_no)
+            for i in range(FCB_SIZE, (count + 1) * FCB_SIZE, FCB_SIZE):
+                if view[i:i + 8] == key:
+                    fcb = self.parse_fcb(view, i)
+                    if file_type is None or fcb[3] == file_type:
+                        return i // FCB_SIZE - 1, fcb
+            return None
+        key_hash = zlib.crc32(key)
+        for index in (loc - 1 for _, stored, loc in self._probe(index_head, buckets, key_hash)
+                      if loc and stored == key_hash):
+            entry_block, offset = self.entry_location(block_no, index)
+            view = self.block_view(entry_block)
+            if view[offset:offset + 8] == key:
+                fcb = self.parse_fcb(view, offset)
+                if file_type is None or fcb[3] == file_type:
+                    return index, fcb
+        return None
 
     def find_block_by_name(self, name, file_type):
         """在当前目录查找指定名称的文件或目录块号"""
-        data = self.read_block(self.current_directory)
-        for i in range(0, len(data), 32):  # 遍历32字节单位
-            fcb_data = data[i:i + 32]
-            if fcb_data.strip(b'\x00'):
-                fcb_name, _, first_block, fcb_type, _, _ = self.parse_fcb(fcb_data)
-                if fcb_name == name and fcb_type == file_type:
-                    return first_block
-        return None
+        found = self.find_entry(self.current_directory, name, file_type)
+        return found[1][2] if found else None
+
+    def _resolve(self, parts):
+        """
+        按规范化路径查找文件或目录，先查目录项缓存，未命中时从根目录逐级扫描目录块并缓存结果
+        :param parts: 从根目录开始的名称列表
+        :return: (起始块号, 类型)，不存在时返回 None
+        """
+        if not parts:
+            return 0, 2
+        key = join_path(parts)
+        entry = self.dcache.get(key)
+        if entry is None:
+            block_no, file_type = 0, 2
+            for name in parts:
+                if file_type != 2:
+                    return None
+                found = self.find_entry(block_no, name)
+                if found is None:
+                    return None
+                block_no, file_type = found[1][2], found[1][3]
+            entry = (block_no, file_type)
+            self.dcache.put(key, entry)
+        return entry
 
     def info(self, block_no=None):
         """显示虚盘的 FAT 表及指定块的内容"""
@@ -385,18 +1237,144 @@ class FATFileSystem:
                 print(f"{hex_data:<48} {ascii_data}")
 
     def close(self):
-        """关闭文件系统"""
+        """关闭文件系统，关闭前写回FAT表与缓冲区中的脏块"""
+        self.flush_blocks()
+        if self.map is not None:
+            self.view.release()
+            self.map.flush()
+            self.map.close()
         self.disk_file.close()
 
 
+class FATFile:
+    """
+    FAT 文件系统中打开的文件，维护读写位置。
+    顺序读时预读窗口逐次加倍，一次读入整段；发生跳转时窗口复位为一块。
+    连续的写入先在写合并缓冲中拼接，累计到阈值时整块写盘，发生跳转、读或关闭时全部写回。
+    """
+    def __init__(self, fs, parts, first_block, size, readahead_blocks=64, coalesce_blocks=64):
+        """
+        :param fs: 所属的文件系统
+        :param parts: 文件从根目录开始的路径
+        :param first_block: 文件的起始块号
+        :param size: 文件大小（字节）
+        :param readahead_blocks: 预读窗口的上限（块数）
+        :param coalesce_blocks: 写合并缓冲累计到多少块后写盘
+        """
+        self.fs = fs
+        self.parts = parts
+        self.first_block = first_block
+        self.size = size
+        self.pos = 0
+        self.max_window = readahead_blocks * fs.block_size
+        self.window = fs.block_size  # 当前预读窗口（字节）
+        self.ahead_pos, self.ahead = 0, b""  # 预读缓冲在文件中的起始位置及其内容
+        self.coalesce = coalesce_blocks * fs.block_size
+        self.pending_pos, self.pending = 0, bytearray()  # 写合并缓冲在文件中的起始位置及其内容
+        self.resized = False  # 文件大小是否已改变而尚未写回 FCB
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def seek(self, pos):
+        """移动读写位置，可超出文件末尾，之后写入时中间部分以零填充"""
+        self.pos = pos
+
+    def tell(self):
+        return self.pos
+
+    def read(self, size=-1):
+        """从当前位置读取至多 size 字节，size 为负时读到文件末尾"""
+        self._write_pending()
+        size = max(0, self.size - self.pos) if size < 0 else max(0, min(size, self.size - self.pos))
+        offset = self.pos - self.ahead_pos
+        if 0 <= offset and offset + size <= len(self.ahead):  # 整段命中预读缓冲
+            self.pos += size
+            return self.ahead[offset:offset + size]
+        out = bytearray()
+        while size:
+            offset = self.pos - self.ahead_pos
+            if not 0 <= offset < len(self.ahead):
+                sequential = self.ahead and self.pos == self.ahead_pos + len(self.ahead)
+                self.window = min(self.window * 2, self.max_window) if sequential else self.fs.block_size
+                length = min(max(self.window, size), self.size - self.pos)
+                self.ahead_pos, self.ahead = self.pos, self.fs.read_range(self.first_block, self.pos, length)
+                offset = 0
+            chunk = self.ahead[offset:offset + size]
+            out += chunk
+            self.pos += len(chunk)
+            size -= len(chunk)
+        return bytes(out)
+
+    def write(self, data):
+        """在当前位置写入数据，与上次写入相接时并入写合并缓冲"""
+        if self.pending and self.pos != self.pending_pos + len(self.pending):
+            self._write_pending()
+        if not self.pending:
+            self.pending_pos = self.pos
+        self.pending += data
+        self.pos += len(data)
+        self.ahead = b""
+        if len(self.pending) >= self.coalesce:
+            # 只写出到最后一个整块边界为止，末尾不足一块的部分留待与后续写入合并，避免反复读改写同一块
+            end = self.pending_pos + len(self.pending)
+            self._write_pending(end - end % self.fs.block_size)
+        return len(data)
+
+    def _write_pending(self, end=None):
+        """把写合并缓冲中 end 之前的部分写入块链，写入位置超出文件末尾时先以零填充"""
+        if not self.pending:
+            return
+        end = self.pending_pos + len(self.pending) if end is None else end
+        if end <= self.pending_pos:
+            return
+        pos, data = self.pending_pos, self.pending[:end - self.pending_pos]
+        if pos > self.size:
+            data = bytes(pos - self.size) + data
+            pos = self.size
+        self.fs.write_range(self.first_block, pos, data, self.size)
+        del self.pending[:end - self.pending_pos]
+        self.pending_pos = end
+        if end > self.size:
+            self.size = end
+            self.resized = True
+
+    def truncate(self, size=None):
+        """把文件截断或以零扩展到 size 字节，缺省为当前位置"""
+        self._write_pending()
+        size = self.pos if size is None else size
+        if size < self.size:
+            self.fs.truncate_chain(self.first_block, size)
+        else:
+            self.fs.write_range(self.first_block, self.size, bytes(size - self.size), self.size)
+        if size != self.size:
+            self.size = size
+            self.resized = True
+        self.ahead = b""
+
+    def flush(self):
+        """写回写合并缓冲，并把文件大小写回 FCB"""
+        self._write_pending()
+        if self.resized:
+            self.fs.set_file_size(self.parts, self.size)
+            self.resized = False
+
+    def close(self):
+        self.flush()
+
+
 def console():
     fs = FATFileSystem()
     print("Welcome to the FAT File System Console (type 'help' for commands)")
 
     while True:
         # 显示当前目录路径
-        current_path = f"\\{fs.current_directory}"
-        command = input(f"{current_path}> ").strip().lower()
+        current_path = "\\" + "\\".join(fs.cwd)
+        line = input(f"{current_path}> ").strip()
+        command = line.lower()
 
         # 解析命令
         if command.startswith("md "):
@@ -419,8 +1397,33 @@ def console():
         elif command.startswith("del "):
             name = command[4:].strip()
             fs.del_file(name)
+        elif command.startswith("ren "):
+            parts = command[4:].split()
+            if len(parts) == 2:
+                fs.ren(parts[0], parts[1])
+            else:
+                print("Usage: REN path newname")
+        elif command.startswith("read "):
+            data = fs.read_file(command[5:].strip())
+            if data is not None:
+                print(data.decode(errors="replace"))
+        elif command.startswith(("write ", "append ")):
+            parts = command.split(maxsplit=2)
+            if len(parts) >= 2:
+                text = line.split(maxsplit=2)[2] if len(parts) == 3 else ""  # 文本保留原大小写
+                fs.write_file(parts[1], text.encode(), append=command.startswith("append "))
+            else:
+                print("Usage: WRITE|APPEND path [text]")
+        elif command.startswith("trunc "):
+            parts = command[6:].split()
+            if len(parts) == 2 and parts[1].isdigit():
+                fs.truncate_file(parts[0], int(parts[1]))
+            else:
+                print("Usage: TRUNC path size")
         elif command == "dir":
             fs.dir()
+        elif command.startswith("dir "):
+            fs.dir(command[4:].strip())
         elif command == "exit":
             print("Exiting the FAT File System Console...")
             fs.close()
@@ -446,13 +1449,19 @@ def get_path(directory):
 def print_help():
     """显示帮助信息"""
     print("\nAvailable Commands:")
-    print("MD dirname       - Create a new directory")
-    print("MK filename [size] - Create a new file with optional size")
-    print("CD dirname       - Change directory")
+    print("Paths may be absolute (\\a\\b or /a/b) or relative, and may contain . and ..")
+    print("MD path          - Create a new directory")
+    print("MK path [size]   - Create a new file with optional size")
+    print("CD path          - Change directory")
     print("CD ..            - Go up one directory level")
-    print("RD dirname       - Remove an empty directory")
-    print("DEL filename     - Delete a file")
-    print("DIR              - List contents of the current directory")
+    print("RD path          - Remove an empty directory")
+    print("DEL path         - Delete a file")
+    print("REN path newname - Rename a file or directory")
+    print("READ path        - Display the contents of a file")
+    print("WRITE path text  - Overwrite a file with text, creating it if needed")
+    print("APPEND path text - Append text to a file, creating it if needed")
+    print("TRUNC path size  - Truncate or zero-extend a file to size bytes")
+    print("DIR [path]       - List contents of the current (or given) directory")
     print("INFO [block_no]  - Display FAT table and block contents")
     print("EXIT             - Exit the file system\n")
 
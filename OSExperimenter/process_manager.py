@@ -8,31 +8,69 @@
 * IDE: PyCharm 
 * Function: OS实验一 进程控制 & 实验二 分页式存储管理
 """
-import datetime
+import os
+import sys
+import mmap
+import io
+import csv
+import json
 import time
 import random
+import tempfile
+import itertools
+import threading
+import contextlib
 import collections
+from array import array
 from math import ceil
-from util import UniqueStack, Bit
+import numpy as np
+from util import UniqueStack, Bit, PIDAllocator, NullLock, RingBuffer, synchronized
 
 random.seed(42)
 BLOCK_NUM = 64  # 内存块数
 BLOCK_SIZE = PAGE_SIZE = 1024  # 块/页大小
+PAGE_SHIFT = PAGE_SIZE.bit_length() - 1  # 页内偏移位数（页大小为2的幂）
 BYTE_LENGTH = 8  # 位示图单位长度
 INPUT_NUM = 3  # 程序被放入内存的块数
+LEVEL_BITS = 10  # 多级页表中每级页表的索引位数
 
 
 class PCB:
-    def __init__(self, name: str, memory_size: int, pc: int = None):
-        self.pid = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
+    def __init__(self, name: str, memory_size: int, pc: int = None, levels: int = 1, pid: int = None):
+        self.pid = pid  # 由 ProcessManager 的进程号分配器分配
         self.name = name
         self.next = None
+        self.prev = None
+        self.queue = None  # 进程当前所在的队列
         self.memory_size = memory_size  # 进程所占空间
         self.state = '新建'  # 新建, 就绪, 执行, 阻塞, 完成
         self.pc = pc
+        self.lock = NullLock()  # 保护页表与驻留集，线程安全模式下由 ProcessManager 替换为可重入锁
+        self.quota = INPUT_NUM  # 驻留集大小上限（可占用的内存块数）
+        self.faults = 0  # 缺页次数
+        self.refs = 0  # 访存次数
 
         self.block_num = ceil(self.memory_size / BLOCK_SIZE)  # 进程所占内存块数
-        self.page_table = [PageTable(no) for no in range(self.block_num)]  # 定义并初始化页表
+        self.lazy = levels > 1  # 多级页表按需分配，页面首次访问时才建立页表项
+        if self.lazy:
+            self.frames = None
+            self.page_table = MultiLevelPageTable(self.block_num, levels)
+        else:
+            self.page_table = PageTableArray(self.block_num)  # 定义并初始化页表
+            self.frames = self.page_table.frames  # 页表物理块号的数组视图，-1表示不在内存
+        self.resident = UniqueStack(capacity=max(self.block_num, 1))  # 驻留页号，栈底为首选淘汰页
+
+    def lookup_frames(self, page_nos: np.ndarray) -> np.ndarray:
+        """
+        按页号批量查询物理块号，越界页号不会引发异常，其结果由调用者按越界处理。
+        :param page_nos: 页号数组
+        :return: 物理块号数组，-1表示不在内存
+        """
+        return self.page_table.lookup_frames(page_nos)
+
+    def resident_dirty_pages(self) -> np.ndarray:
+        """返回所有驻留在内存中且被修改过的页号"""
+        return self.page_table.resident_dirty()
 
     def display_page_table(self):
         """详细展示进程的页表"""
@@ -41,14 +79,125 @@ class PCB:
             print(pt)
 
 
+# 页表项的紧凑存储格式，块号与置换区地址为 -1 时表示无
+PTE_DTYPE = np.dtype([('block', np.int32), ('address', np.int32), ('visit_time', np.uint32),
+                      ('state', np.uint8), ('dirty', np.uint8), ('referenced', np.uint8)])
+
+
+class PageTableArray:
+    """
+    以结构化数组存储的页表，每个页表项只占 PTE_DTYPE.itemsize 个字节。
+    下标访问返回 PageTable 视图对象，读写视图即读写数组中的对应页表项。
+    """
+    def __init__(self, page_num: int, base: int = 0):
+        """
+        :param page_num: 页表项数
+        :param base: 第一个页表项的页号（多级页表的末级页表不从0开始）
+        """
+        self.base = base
+        self.entries = np.zeros(page_num, dtype=PTE_DTYPE)
+        self.entries['block'] = -1
+        self.entries['address'] = -1
+
+    @property
+    def frames(self) -> np.ndarray:
+        """物理块号字段的数组视图"""
+        return self.entries['block']
+
+    def lookup_frames(self, page_nos: np.ndarray) -> np.ndarray:
+        """按页号批量查询物理块号，越界页号被截断到合法范围"""
+        return self.entries['block'].take(page_nos - self.base, mode='clip').astype(np.int64)
+
+    def resident_dirty(self) -> np.ndarray:
+        """返回所有驻留在内存中且被修改过的页号"""
+        return np.flatnonzero((self.entries['state'] == 1) & (self.entries['dirty'] == 1)) + self.base
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [PageTable(self.base + idx, self) for idx in range(*item.indices(len(self.entries)))]
+        idx = item - self.base if item >= 0 else item + len(self.entries)
+        if not 0 <= idx < len(self.entries):
+            raise IndexError('页号越界！')
+        return PageTable(self.base + idx, self)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __iter__(self):
+        for idx in range(len(self.entries)):
+            yield PageTable(self.base + idx, self)
+
+    def __str__(self) -> str:
+        return str(list(self))
+
+    __repr__ = __str__
+
+
 class PageTable:
-    def __init__(self, no: int, p=0, m=False):
+    """页表项，是 PageTableArray 中某一项的视图。"""
+    __slots__ = ('no', '_entries', '_idx')
+
+    def __init__(self, no: int, table: PageTableArray = None):
         self.no = no  # 页号
-        self.block = None  # 物理块号
-        self.state = p  # 状态位
-        self.visit_time = 0  # 访问字段
-        self.dirty = m  # 修改位
-        self.address = None  # 外存地址，若该页不在内存中，则为置换区位置(块号)
+        table = table if table is not None else PageTableArray(1, base=no)
+        self._entries = table.entries
+        self._idx = no - table.base
+
+    @property
+    def block(self):
+        """物理块号，不在内存中时为 None"""
+        blk = int(self._entries['block'][self._idx])
+        return None if blk < 0 else blk
+
+    @block.setter
+    def block(self, blk) -> None:
+        self._entries['block'][self._idx] = -1 if blk is None else blk
+
+    @property
+    def address(self):
+        """外存地址，若该页不在内存中，则为置换区位置(块号)"""
+        addr = int(self._entries['address'][self._idx])
+        return None if addr < 0 else addr
+
+    @address.setter
+    def address(self, addr) -> None:
+        self._entries['address'][self._idx] = -1 if addr is None else addr
+
+    @property
+    def state(self) -> int:
+        """状态位"""
+        return int(self._entries['state'][self._idx])
+
+    @state.setter
+    def state(self, p: int) -> None:
+        self._entries['state'][self._idx] = p
+
+    @property
+    def visit_time(self) -> int:
+        """访问字段"""
+        return int(self._entries['visit_time'][self._idx])
+
+    @visit_time.setter
+    def visit_time(self, t: int) -> None:
+        self._entries['visit_time'][self._idx] = t
+
+    @property
+    def dirty(self) -> bool:
+        """修改位"""
+        return bool(self._entries['dirty'][self._idx])
+
+    @dirty.setter
+    def dirty(self, m: bool) -> None:
+        self._entries['dirty'][self._idx] = m
+
+    @property
+    def referenced(self) -> bool:
+        """访问位，供 CLOCK 置换算法使用"""
+        return bool(self._entries['referenced'][self._idx])
+
+    @referenced.setter
+    def referenced(self, r: bool) -> None:
+        self._entries['referenced'][self._idx] = r
 
     def allot(self, blk: int) -> None:
         """
@@ -67,6 +216,8 @@ class PageTable:
         """
         self.state = 0
         for i in range(BLOCK_NUM // BYTE_LENGTH):
+            if replace_bitmap[i].val == 0xFF:  # 跳过已占满的字节
+                continue
             for j in range(BYTE_LENGTH):
                 if replace_bitmap[i].get(j) == 0:
                     replace_bitmap[i].use(j)
@@ -75,7 +226,7 @@ class PageTable:
 
     def swap_with(self, other) -> None:
         """
-        页面置换时将两个页面的属性进行调换(block和address)
+        页面置换时将两个页面的属性进行调换(block、address和状态位)
         :param other: 另一个 PageTable 对象
         :return: None
         """
@@ -83,6 +234,8 @@ class PageTable:
         self.block, other.block = other.block, self.block
         # 交换 address
         self.address, other.address = other.address, self.address
+        # 交换状态位，使 free_memory 能正确区分内存块与置换区块
+        self.state, other.state = other.state, self.state
 
     def __str__(self) -> str:
         """
@@ -97,16 +250,740 @@ class PageTable:
         """
         return f"({self.no} {self.block} {self.state} {self.address})"
 
+    def __eq__(self, other) -> bool:
+        """同一页表中页号相同的视图视为同一页表项"""
+        return isinstance(other, PageTable) and self._entries is other._entries and self.no == other.no
+
+    def __hash__(self) -> int:
+        return hash((id(self._entries), self.no))
+
+
+class MultiLevelPageTable:
+    """
+    按需分配的多级页表。外层页表只保存下一级页表的引用，
+    末级页表（含 2^LEVEL_BITS 个页表项）在其中某页首次被访问或映射时才创建。
+    支持与普通页表列表相同的下标、切片与迭代操作，迭代时只遍历已创建的页表项。
+    """
+    def __init__(self, page_num: int, levels: int = 2, bits: int = LEVEL_BITS):
+        if levels not in {2, 3}:
+            raise ValueError('多级页表只支持二级或三级！')
+        self.page_num = page_num
+        self.levels = levels
+        self.bits = bits
+        self.top_shift = bits * (levels - 1)  # 页号右移该位数即得外层页表下标
+        self.root = [None] * ceil(page_num / (1 << self.top_shift))
+        self.leaves = {}  # 末级页表序号 -> PageTableArray
+
+    def _leaf(self, page_no: int, create: bool = True):
+        """沿各级页表找到页号所在的末级页表，create 为真时按需创建缺失的页表"""
+        if not 0 <= page_no < self.page_num:
+            raise IndexError('页号越界！')
+        mask = (1 << self.bits) - 1
+        table, idx = self.root, page_no >> self.top_shift
+        for shift in range(self.top_shift - self.bits, 0, -self.bits):  # 逐级查找中间页表
+            if table[idx] is None:
+                if not create:
+                    return None
+                table[idx] = [None] * (1 << self.bits)
+            table, idx = table[idx], (page_no >> shift) & mask
+        if table[idx] is None:
+            if not create:
+                return None
+            base = page_no >> self.bits << self.bits
+            table[idx] = self.leaves[page_no >> self.bits] = PageTableArray(
+                min(1 << self.bits, self.page_num - base), base)
+        return table[idx]
+
+    def get(self, page_no: int):
+        """查询页表项但不创建页表，未建立时返回 None"""
+        leaf = self._leaf(page_no, create=False)
+        return leaf[page_no] if leaf else None
+
+    def lookup_frames(self, page_nos: np.ndarray) -> np.ndarray:
+        """按页号批量查询物理块号，越界或未建立的页表项视为不在内存"""
+        blocks = np.full(page_nos.shape, -1, dtype=np.int64)
+        # 先滤去越界页号：末页所在的末级页表可能不满，越界页号仍会落入已建立的末级页表
+        valid = np.flatnonzero((page_nos >= 0) & (page_nos < self.page_num))
+        leaf_nos = page_nos[valid] >> self.bits
+        order = np.argsort(leaf_nos, kind='stable')  # 按末级页表分组，每组只做一次向量化查询
+        uniq, starts = np.unique(leaf_nos[order], return_index=True)
+        order = valid[order]
+        ends = np.append(starts[1:], len(order))
+        for leaf_no, start, end in zip(uniq.tolist(), starts.tolist(), ends.tolist()):
+            leaf = self.leaves.get(leaf_no)
+            if leaf is not None:
+                idx = order[start:end]
+                blocks[idx] = leaf.frames[page_nos[idx] - leaf.base]
+        return blocks
+
+    def resident_dirty(self) -> np.ndarray:
+        """返回所有驻留在内存中且被修改过的页号"""
+        pages = [self.leaves[leaf_no].resident_dirty() for leaf_no in sorted(self.leaves)]
+        return np.concatenate(pages) if pages else np.empty(0, dtype=np.int64)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self[no] for no in range(*item.indices(self.page_num))]
+        if item < 0:
+            item += self.page_num
+        return self._leaf(item)[item]
+
+    def __len__(self) -> int:
+        return self.page_num
+
+    def __iter__(self):
+        for leaf_no in sorted(self.leaves):
+            yield from self.leaves[leaf_no]
+
+    def __str__(self) -> str:
+        return str(list(self))
+
+    __repr__ = __str__
+
+
+class TLB:
+    """
+    快表（TLB），缓存页号到物理块号的映射。
+    支持全相联或组相联（ways 为每组表项数），替换策略为 LRU 或 RANDOM。
+    """
+    def __init__(self, entries: int = 16, ways: int = None, policy: str = 'LRU',
+                 hit_time: float = 1, mem_time: float = 100):
+        """
+        :param entries: 表项总数
+        :param ways: 每组表项数，None 表示全相联
+        :param policy: 替换策略，'LRU' 或 'RANDOM'
+        :param hit_time: 访问快表耗时（ns）
+        :param mem_time: 访问一次内存耗时（ns）
+        """
+        ways = ways or entries
+        if entries % ways:
+            raise ValueError('快表表项数必须是组相联路数的整数倍！')
+        if policy.upper() not in {'LRU', 'RANDOM'}:
+            raise ValueError("替换策略必须为 'LRU' 或 'RANDOM'")
+        self.entries = entries
+        self.ways = ways
+        self.policy = policy.upper()
+        self.hit_time = hit_time
+        self.mem_time = mem_time
+        self.sets = [collections.OrderedDict() for _ in range(entries // ways)]
+        self.hits = self.misses = 0
+
+    def lookup(self, page_no: int):
+        """
+        查询快表。
+        :param page_no: 页号
+        :return: 命中时返回物理块号，否则返回 None
+        """
+        tlb_set = self.sets[page_no % len(self.sets)]
+        block = tlb_set.get(page_no)
+        if block is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if self.policy == 'LRU':
+            tlb_set.move_to_end(page_no)
+        return block
+
+    def insert(self, page_no: int, block: int) -> None:
+        """将页号与物理块号的映射装入快表，组满时按替换策略淘汰一项"""
+        tlb_set = self.sets[page_no % len(self.sets)]
+        if page_no not in tlb_set and len(tlb_set) >= self.ways:
+            if self.policy == 'LRU':
+                tlb_set.popitem(last=False)
+            else:
+                del tlb_set[random.choice(list(tlb_set))]
+        tlb_set[page_no] = block
+
+    def invalidate(self, page_no: int) -> None:
+        """页面被换出或换入后，使对应快表项失效"""
+        self.sets[page_no % len(self.sets)].pop(page_no, None)
+
+    def flush(self) -> None:
+        """进程切换时清空快表"""
+        for tlb_set in self.sets:
+            tlb_set.clear()
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def effective_access_time(self) -> float:
+        """有效访问时间 EAT = h(t + m) + (1 - h)(t + 2m)"""
+        h = self.hit_rate
+        return h * (self.hit_time + self.mem_time) + (1 - h) * (self.hit_time + 2 * self.mem_time)
+
+    def __str__(self) -> str:
+        return (f"快表{self.entries}项/{self.ways}路({self.policy}): 命中{self.hits}次, 未命中{self.misses}次, "
+                f"命中率{self.hit_rate * 100:.2f}%, 有效访问时间{self.effective_access_time():.2f}ns")
+
+
+class PagingStats:
+    """访存回放的换页统计及模拟I/O开销。"""
+    def __init__(self, read_cost: float = 1.0, write_cost: float = 1.0):
+        """
+        :param read_cost: 从置换区读入一页的开销（ms）
+        :param write_cost: 向置换区写出一页的开销（ms）
+        """
+        self.read_cost = read_cost
+        self.write_cost = write_cost
+        self.reset()
+
+    def reset(self) -> None:
+        self.faults = 0       # 缺页次数
+        self.swap_ins = 0     # 从置换区读入的页数
+        self.zero_fills = 0   # 首次访问、无需读盘的页数
+        self.swap_outs = 0    # 换出时写回置换区的页数（脏页或置换区中无副本）
+        self.clean_drops = 0  # 换出时直接丢弃的干净页数
+        self.prefetches = 0   # 预读的页数
+
+    @property
+    def io_cost(self) -> float:
+        """模拟的总I/O开销"""
+        return (self.swap_ins + self.prefetches) * self.read_cost + self.swap_outs * self.write_cost
+
+    def as_dict(self) -> dict:
+        return {'faults': self.faults, 'swap_ins': self.swap_ins, 'zero_fills': self.zero_fills,
+                'swap_outs': self.swap_outs, 'clean_drops': self.clean_drops, 'prefetches': self.prefetches,
+                'io_cost': self.io_cost}
+
+    def __str__(self) -> str:
+        return (f"缺页{self.faults}次, 换入{self.swap_ins}页, 零页填充{self.zero_fills}页, 预读{self.prefetches}页, "
+                f"脏页写回{self.swap_outs}页, 干净页丢弃{self.clean_drops}页, I/O开销{self.io_cost:.1f}ms")
+
+
+class PageStore:
+    """
+    以内存映射文件模拟物理内存与置换区。换入换出时通过 memoryview 按页搬运内容，
+    每次搬运只有一次内存拷贝，并记录各次传输的耗时以统计吞吐量与延迟。
+    """
+    def __init__(self, frames: int = BLOCK_NUM, swap_slots: int = BLOCK_NUM * 2, page_size: int = PAGE_SIZE,
+                 directory: str = None):
+        """
+        :param frames: 物理内存块数
+        :param swap_slots: 置换区块数
+        :param page_size: 页大小，供 ProcessManager 使用时须等于 PAGE_SIZE
+        :param directory: 存放映射文件的目录，默认为系统临时目录
+        """
+        self.page_size = page_size
+        self._files, self._maps = [], []
+        self.memory = self._map(frames * page_size, directory)  # 物理内存
+        self.swap = self._map(swap_slots * page_size, directory)  # 置换区
+        self._buffer = bytearray(page_size)  # 交换两页内容时使用的缓冲区
+        self.bytes_in = self.bytes_out = 0
+        self.in_ns = array('Q')  # 每次换入的耗时（ns）
+        self.out_ns = array('Q')  # 每次换出的耗时（ns）
+
+    def _map(self, size: int, directory: str) -> memoryview:
+        file = tempfile.TemporaryFile(dir=directory)
+        file.truncate(size)
+        mapped = mmap.mmap(file.fileno(), size)
+        self._files.append(file)
+        self._maps.append(mapped)
+        return memoryview(mapped)
+
+    def frame(self, block: int) -> memoryview:
+        """返回物理内存块的视图"""
+        return self.memory[block * self.page_size:(block + 1) * self.page_size]
+
+    def slot(self, address: int) -> memoryview:
+        """返回置换区块的视图"""
+        return self.swap[address * self.page_size:(address + 1) * self.page_size]
+
+    def page_in(self, address: int, block: int) -> None:
+        """将置换区块的内容读入物理内存块"""
+        start = time.perf_counter_ns()
+        self.frame(block)[:] = self.slot(address)
+        self.in_ns.append(time.perf_counter_ns() - start)
+        self.bytes_in += self.page_size
+
+    def page_out(self, block: int, address: int) -> None:
+        """将物理内存块的内容写出到置换区块"""
+        start = time.perf_counter_ns()
+        self.slot(address)[:] = self.frame(block)
+        self.out_ns.append(time.perf_counter_ns() - start)
+        self.bytes_out += self.page_size
+
+    def zero_fill(self, block: int) -> None:
+        """首次访问的页面，将物理内存块清零"""
+        self.frame(block)[:] = bytes(self.page_size)
+
+    def exchange(self, block: int, address: int) -> None:
+        """交换物理内存块与置换区块的内容（PageTable.swap_with 的数据搬运部分）"""
+        self._buffer[:] = self.frame(block)
+        self.page_in(address, block)
+        start = time.perf_counter_ns()
+        self.slot(address)[:] = self._buffer
+        self.out_ns.append(time.perf_counter_ns() - start)
+        self.bytes_out += self.page_size
+
+    def sync(self) -> None:
+        """将映射内容刷写到磁盘"""
+        for mapped in self._maps:
+            mapped.flush()
+
+    def report(self) -> dict:
+        """统计换入换出的吞吐量（MB/s）与延迟分位数（μs）"""
+        result = {}
+        for name, samples, nbytes in (('in', self.in_ns, self.bytes_in), ('out', self.out_ns, self.bytes_out)):
+            if not samples:
+                continue
+            lat = np.frombuffer(samples, dtype=np.uint64) / 1e3
+            result[name] = {'pages': len(samples), 'MB/s': float(nbytes / 1e6 / (lat.sum() / 1e6)),
+                            'p50': float(np.percentile(lat, 50)), 'p99': float(np.percentile(lat, 99))}
+        return result
+
+    def close(self) -> None:
+        self.memory.release()
+        self.swap.release()
+        for mapped in self._maps:
+            mapped.close()
+        for file in self._files:
+            file.close()
+
+
+class FrameAllocator:
+    """
+    进程间的内存块分配策略。
+    FIXED 为每个进程固定分配 INPUT_NUM 块；WS 按滑动窗口内的工作集大小分配；
+    PFF 按滑动窗口内的缺页频率增减驻留集。scope 为 GLOBAL 时缺页进程可淘汰任意进程的页面，
+    为 LOCAL 时只在本进程的驻留集中选择淘汰页。
+    """
+    def __init__(self, mode: str = 'FIXED', scope: str = 'LOCAL', window: int = 50,
+                 pff_low: float = 0.02, pff_high: float = 0.1, min_frames: int = 1, max_frames: int = BLOCK_NUM):
+        """
+        :param mode: 分配策略，'FIXED'、'WS' 或 'PFF'
+        :param scope: 置换范围，'LOCAL' 或 'GLOBAL'
+        :param window: 滑动窗口长度（进程的访问次数），WS 中即工作集窗口
+        :param pff_low: 缺页率低于该值时收缩驻留集
+        :param pff_high: 缺页率高于该值时扩大驻留集
+        :param min_frames: 每个进程至少分配的块数
+        :param max_frames: 每个进程至多分配的块数
+        """
+        if mode.upper() not in {'FIXED', 'WS', 'PFF'}:
+            raise ValueError("分配策略必须为 'FIXED'、'WS' 或 'PFF'")
+        if scope.upper() not in {'LOCAL', 'GLOBAL'}:
+            raise ValueError("置换范围必须为 'LOCAL' 或 'GLOBAL'")
+        self.mode = mode.upper()
+        self.scope = scope.upper()
+        self.window = window
+        self.pff_low = pff_low
+        self.pff_high = pff_high
+        self.min_frames = min_frames
+        self.max_frames = max_frames
+        self.history = {}  # pid -> 滑动窗口（WS 为页号序列，PFF 为是否缺页序列）
+        self.counts = {}   # pid -> WS 窗口内各页的访问次数 / PFF 窗口内的缺页次数
+
+    def record(self, pm, process: PCB, page_no: int, fault: bool) -> None:
+        """
+        每次访存后调用，更新进程的滑动窗口并调整其驻留集大小。
+        :param pm: 进程管理器，用于换出被收缩的页面
+        :param process: 访存的进程
+        :param page_no: 访问的页号
+        :param fault: 本次访问是否缺页
+        """
+        if self.mode == 'FIXED':
+            return
+        window = self.history.setdefault(process.pid, collections.deque())
+        if self.mode == 'WS':
+            counts = self.counts.setdefault(process.pid, collections.Counter())
+            window.append(page_no)
+            counts[page_no] += 1
+            if len(window) > self.window:
+                old = window.popleft()
+                counts[old] -= 1
+                if not counts[old]:  # 页面离开工作集，将其换出
+                    del counts[old]
+                    if old in process.resident:
+                        pm.evict_page(process, old)
+            process.quota = max(self.min_frames, min(self.max_frames, len(counts)))
+        else:
+            window.append(fault)
+            self.counts[process.pid] = self.counts.get(process.pid, 0) + fault
+            if len(window) > self.window:
+                self.counts[process.pid] -= window.popleft()
+            if len(window) < self.window:
+                return
+            rate = self.counts[process.pid] / len(window)
+            if rate > self.pff_high and process.quota < self.max_frames:
+                process.quota += 1
+            elif rate < self.pff_low and process.quota > self.min_frames:
+                process.quota -= 1
+            else:
+                return
+            window.clear()  # 调整后重新统计，避免连续调整
+            self.counts[process.pid] = 0
+        while len(process.resident) > process.quota:
+            pm.evict_page(process, pm.choose_victim_page(process))
+
+    def forget(self, process: PCB) -> None:
+        """进程结束时清除其统计信息"""
+        self.history.pop(process.pid, None)
+        self.counts.pop(process.pid, None)
+
+
+class Readahead:
+    """
+    缺页时的自适应顺序预读。按进程检测顺序缺页：缺页页号恰为上次缺页或上一批预读的下一页时，
+    从置换区预先读入其后 window 个页面；进程访问到一批预读页的末页时接着读入下一批，使顺序扫描不再缺页。
+    模拟中换入没有延迟，因此在末页而非首页触发下一批，使同时驻留的预读页不超过一个窗口。
+    每次连续预读时窗口加倍，预读页未被访问即被换出时窗口减半。
+    """
+    def __init__(self, min_window: int = 2, max_window: int = 16):
+        """
+        :param min_window: 检测到顺序缺页时的初始预读页数
+        :param max_window: 预读页数上限
+        """
+        if not 1 <= min_window <= max_window:
+            raise ValueError('预读窗口必须满足 1 <= min_window <= max_window')
+        self.min_window = min_window
+        self.max_window = max_window
+        self.state = {}    # pid -> [预期的下一缺页页号, 窗口大小, 最近一批预读的末页]
+        self.pending = {}  # pid -> 已预读但尚未访问的页号集合
+        self.reset()
+
+    def reset(self) -> None:
+        self.hits = 0    # 被访问到的预读页数，即预读避免的缺页次数
+        self.wasted = 0  # 未被访问即被换出的预读页数
+
+    def record(self, pm, process: PCB, page_no: int, fault: bool) -> None:
+        """
+        每次访存后调用，检测顺序缺页并发起预读。
+        :param pm: 进程管理器，用于读入预读页
+        :param process: 访存的进程
+        :param page_no: 访问的页号
+        :param fault: 本次访问是否缺页
+        """
+        state = self.state.get(process.pid)
+        if fault:
+            if state is None or page_no != state[0]:  # 随机访问，重新开始检测
+                self.state[process.pid] = [page_no + 1, self.min_window, None]
+                return
+            self._read(pm, process, state, page_no + 1)
+            return
+        pending = self.pending.get(process.pid)
+        if not pending or page_no not in pending:
+            return
+        pending.remove(page_no)
+        self.hits += 1
+        if page_no == state[2]:
+            state[1] = min(state[1] * 2, self.max_window)
+            self._read(pm, process, state, state[0])
+
+    def _read(self, pm, process: PCB, state: list, start: int) -> None:
+        """从 start 开始预读至多一个窗口的页面，遇到不在置换区中的页面时停止"""
+        window = state[1]
+        if pm.frame_allocator.scope == 'LOCAL':
+            # 局部置换时预读页会挤占本进程的驻留集，须为当前访问的页面留出位置
+            window = min(window, process.quota - 1)
+        end = min(start + max(window, 0), process.block_num)
+        pending = self.pending.setdefault(process.pid, set())
+        state[0], state[2] = end, None
+        for page_no in range(start, end):
+            page = process.page_table[page_no]
+            if page.state == 1:
+                continue
+            if page.address is None:
+                state[0] = page_no
+                break
+            try:
+                pm.prefetch_page(process, page)
+            except RuntimeError:  # 置换区已满，无法腾出内存块
+                state[0] = page_no
+                break
+            pending.add(page_no)
+            state[2] = page_no
+
+    def evicted(self, process: PCB, page_no: int) -> None:
+        """页面被换出时调用，预读页未被访问即被换出说明窗口过大"""
+        pending = self.pending.get(process.pid)
+        if pending and page_no in pending:
+            pending.remove(page_no)
+            self.wasted += 1
+            state = self.state[process.pid]
+            state[1] = max(state[1] // 2, self.min_window)
+
+    def forget(self, process: PCB) -> None:
+        """进程结束时清除其预读状态"""
+        self.state.pop(process.pid, None)
+        self.pending.pop(process.pid, None)
+
+    def __str__(self) -> str:
+        return f"预读命中{self.hits}页, 浪费{self.wasted}页"
+
+
+class PageReclaimer:
+    """
+    后台页面回收器（类似 Linux 的 kswapd）。空闲块数低于低水位时被唤醒，
+    按置换算法的顺序淘汰最久未访问进程的冷页面，直到空闲块数回到高水位，
+    使缺页时通常能直接取得空闲块，不必在缺页处理中同步淘汰页面。
+    可由 ProcessManager 每隔 interval 次访存调用一次 tick 模拟周期运行，也可用 start 启动后台线程。
+    """
+    def __init__(self, low: int = BLOCK_NUM // 16, high: int = BLOCK_NUM // 8, interval: int = 8):
+        """
+        :param low: 低水位，空闲块数低于该值时开始回收
+        :param high: 高水位，回收到空闲块数不低于该值为止
+        :param interval: 模拟运行时每隔多少次访存检查一次水位
+        """
+        if not 0 <= low <= high <= BLOCK_NUM:
+            raise ValueError('水位必须满足 0 <= low <= high <= BLOCK_NUM')
+        self.low = low
+        self.high = high
+        self.interval = interval
+        self.runs = 0       # 实际执行回收的次数
+        self.reclaimed = 0  # 回收的页面数
+        self._countdown = interval
+        self._thread = None
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+
+    def balance(self, pm) -> int:
+        """
+        空闲块数低于低水位时回收页面至高水位。
+        :param pm: ProcessManager 对象
+        :return: 本次回收的页面数
+        """
+        if pm.free_frames() >= self.low:
+            return 0
+        self.runs += 1
+        count = 0
+        while pm.free_frames() < self.high:
+            try:
+                pm._steal_frame(None, release=True)
+            except RuntimeError:  # 已无可淘汰的页面，或置换区已满
+                break
+            count += 1
+        self.reclaimed += count
+        return count
+
+    def tick(self, pm) -> None:
+        """模拟时钟：每调用 interval 次检查一次水位"""
+        self._countdown -= 1
+        if self._countdown <= 0:
+            self._countdown = self.interval
+            self.balance(pm)
+
+    def wake(self, pm) -> None:
+        """分配内存块后调用，后台线程运行时若空闲块数已低于低水位则立即唤醒"""
+        if self._thread is not None and pm.free_frames() < self.low:
+            self._wakeup.set()
+
+    def start(self, pm, period: float = 0.01) -> None:
+        """
+        启动后台回收线程，要求 pm 为线程安全模式。
+        :param period: 未被唤醒时检查水位的周期（秒）
+        """
+        if not pm.thread_safe:
+            raise ValueError('后台回收线程要求进程管理器为线程安全模式！')
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(pm, period), name='reclaimer', daemon=True)
+        self._thread.start()
+
+    def _run(self, pm, period: float) -> None:
+        while not self._stop.is_set():
+            self._wakeup.wait(period)
+            self._wakeup.clear()
+            self.balance(pm)
+
+    def stop(self) -> None:
+        """停止后台回收线程"""
+        if self._thread is not None:
+            self._stop.set()
+            self._wakeup.set()
+            self._thread.join()
+            self._thread = None
+
+    def __str__(self) -> str:
+        return f"后台回收{self.runs}次, 回收{self.reclaimed}页（水位 {self.low}/{self.high}）"
+
+
+SYSTEM_SAMPLE_DTYPE = np.dtype([('event', np.uint64), ('free_frames', np.uint16), ('largest_free_run', np.uint16),
+                                ('swap_used', np.uint16), ('processes', np.uint16), ('faults', np.uint64)])
+PROCESS_SAMPLE_DTYPE = np.dtype([('event', np.uint64), ('pid', np.uint32), ('rss', np.uint16), ('faults', np.uint32)])
+
+
+class Telemetry:
+    """
+    内存使用与碎片遥测。回放期间每隔 interval 个事件采样一次空闲块数、最大连续空闲块数、置换区占用、
+    累计缺页次数，以及各进程的驻留集大小与缺页次数，存放在定长环形缓冲区中，可导出为 CSV 或 JSON。
+    """
+    def __init__(self, interval: int = 100, capacity: int = 4096, process_capacity: int = None):
+        """
+        :param interval: 采样间隔（事件数）
+        :param capacity: 保存的系统采样数
+        :param process_capacity: 保存的进程采样数（每次采样每个进程一条），默认为 capacity 的 16 倍
+        """
+        if interval <= 0:
+            raise ValueError('采样间隔必须为正数！')
+        self.interval = interval
+        self.system = RingBuffer(SYSTEM_SAMPLE_DTYPE, capacity)
+        self.processes = RingBuffer(PROCESS_SAMPLE_DTYPE, process_capacity or capacity * 16)
+        self.names = {}  # pid -> 进程名（进程号被复用时为最近一次采样时的进程名）
+        self.events = 0
+
+    def tick(self, pm) -> None:
+        """每个事件后调用，到达采样间隔时采样"""
+        self.events += 1
+        if self.events % self.interval == 0:
+            self.sample(pm)
+
+    def sample(self, pm) -> None:
+        """立即采样一次"""
+        processes = list(pm.processes.values())
+        self.system.append((self.events, pm.free_frames(), pm.largest_free_run(), pm.swap_used(), len(processes),
+                            pm.stats.faults))
+        for process in processes:
+            self.names[process.pid] = process.name
+        self.processes.extend(np.array([(self.events, p.pid, len(p.resident), p.faults) for p in processes],
+                                       dtype=PROCESS_SAMPLE_DTYPE))
+
+    def _records(self, kind: str) -> list[dict]:
+        if kind not in {'system', 'process'}:
+            raise ValueError("采样类型必须为 'system' 或 'process'")
+        data = self.system.to_array() if kind == 'system' else self.processes.to_array()
+        records = [dict(zip(data.dtype.names, row)) for row in data.tolist()]
+        if kind == 'process':
+            for record in records:
+                record['name'] = self.names.get(record['pid'], '')
+        return records
+
+    def to_csv(self, path: str = None, kind: str = 'system') -> str:
+        """
+        导出采样为 CSV。
+        :param path: 输出文件路径，为 None 时只返回文本
+        :param kind: 'system' 为系统采样，'process' 为进程采样
+        :return: CSV 文本
+        """
+        records = self._records(kind)
+        fields = list(SYSTEM_SAMPLE_DTYPE.names if kind == 'system' else PROCESS_SAMPLE_DTYPE.names + ('name',))
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fields, lineterminator='\n')
+        writer.writeheader()
+        writer.writerows(records)
+        text = buffer.getvalue()
+        if path is not None:
+            with open(path, 'w', encoding='utf-8', newline='') as f:
+                f.write(text)
+        return text
+
+    def to_json(self, path: str = None) -> str:
+        """
+        导出全部采样为 JSON，包含采样间隔、被覆盖的采样数、系统采样与进程采样。
+        :param path: 输出文件路径，为 None 时只返回文本
+        :return: JSON 文本
+        """
+        text = json.dumps({'interval': self.interval,
+                           'dropped': {'system': self.system.dropped, 'process': self.processes.dropped},
+                           'system': self._records('system'), 'process': self._records('process')},
+                          ensure_ascii=False)
+        if path is not None:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text)
+        return text
+
+    def __str__(self) -> str:
+        return (f"遥测：每{self.interval}个事件采样, 已采样{self.system.count}次, "
+                f"保存{len(self.system)}条系统采样与{len(self.processes)}条进程采样")
+
+
+class ProcessQueue:
+    """带尾指针的双向链表进程队列，入队、出队及移除任意进程均为 O(1)。"""
+    def __init__(self, state: str):
+        """
+        :param state: 进程进入该队列后的状态，如 '就绪' 或 '阻塞'
+        """
+        self.state = state
+        self.head = None
+        self.tail = None
+        self.size = 0
+
+    def enqueue(self, process: PCB) -> None:
+        """将进程加入队尾，并修改其状态"""
+        process.state = self.state
+        process.queue = self
+        process.next = None
+        process.prev = self.tail
+        if self.tail is None:
+            self.head = process
+        else:
+            self.tail.next = process
+        self.tail = process
+        self.size += 1
+
+    def dequeue(self):
+        """取出队头进程，队列为空时返回 None"""
+        process = self.head
+        if process is not None:
+            self.remove(process)
+        return process
+
+    def remove(self, process: PCB) -> None:
+        """从队列中移除指定进程"""
+        if process.queue is not self:
+            raise ValueError(f'进程 {process.name} 不在该队列中！')
+        if process.prev is None:
+            self.head = process.next
+        else:
+            process.prev.next = process.next
+        if process.next is None:
+            self.tail = process.prev
+        else:
+            process.next.prev = process.prev
+        process.prev = process.next = process.queue = None
+        self.size -= 1
+
+    def __iter__(self):
+        current = self.head
+        while current:
+            yield current
+            current = current.next
+
+    def __len__(self) -> int:
+        return self.size
+
 
 class ProcessManager:
-    def __init__(self):
-        self.ready_head = None      # 就绪队列
-        self.blocked_head = None    # 阻塞队列
+    def __init__(self, tlb: TLB = None, page_table_levels: int = 1, frame_allocator: FrameAllocator = None,
+                 policy: str = 'LRU', stats: PagingStats = None, page_store: PageStore = None,
+                 thread_safe: bool = False, reclaimer: PageReclaimer = None, readahead: Readahead = None,
+                 telemetry: Telemetry = None):
+        self.ready = ProcessQueue('就绪')    # 就绪队列
+        self.blocked = ProcessQueue('阻塞')  # 阻塞队列
         self.finished_head = None   # 结束队列
         self.running = None         # 运行进程
+        self.processes = {}         # 进程名 -> PCB
+        self.pid_index = {}         # pid -> PCB
+        self.pid_allocator = PIDAllocator()  # 进程号分配器
         self.bitmap = [Bit() for _ in range(BLOCK_NUM // BYTE_LENGTH)]
         self.replace_bitmap = [Bit() for _ in range(BLOCK_NUM * 2 // BYTE_LENGTH)]
         self.pc = 0  # 指令计数器
+        self.tlb = tlb or TLB()  # 快表
+        self.page_table_levels = page_table_levels  # 新建进程的页表级数，大于1时使用按需分配的多级页表
+        self.frame_allocator = frame_allocator or FrameAllocator()  # 进程间内存块分配策略
+        if policy.upper() not in {'FIFO', 'LRU', 'CLOCK'}:
+            raise ValueError("置换算法必须为 'FIFO'、'LRU' 或 'CLOCK'")
+        self.policy = policy.upper()  # 访存回放时使用的页面置换算法，CLOCK 为优先淘汰干净页的改进型时钟算法
+        self.stats = stats or PagingStats()  # 换页统计
+        if page_store is not None and page_store.page_size != PAGE_SIZE:
+            raise ValueError(f'页面存储的页大小必须为 {PAGE_SIZE} 字节！')  # 访存时按 PAGE_SIZE 计算页内偏移
+        self.page_store = page_store  # 物理内存与置换区的实际内容，为 None 时只模拟页号不搬运数据
+        self.reclaimer = reclaimer  # 后台页面回收器，为 None 时只在缺页时同步淘汰页面
+        self.readahead = readahead  # 缺页时的顺序预读，为 None 时每次缺页只换入一页
+        self.telemetry = telemetry  # 内存使用遥测，为 None 时不采样
+        self.clock = 0  # 访存回放的逻辑时钟
+        self._ticks = itertools.count(1)
+
+        # 线程安全模式下的细粒度锁：队列锁保护就绪/阻塞队列、运行进程、进程索引与进程号分配器；
+        # 位示图按字节分段加锁；页表与驻留集由各进程自己的锁保护
+        self.thread_safe = thread_safe
+        lock = threading.Lock if thread_safe else NullLock
+        self.queue_lock = threading.RLock() if thread_safe else NullLock()
+        self.bitmap_locks = [lock() for _ in self.bitmap]
+        self.swap_locks = [lock() for _ in self.replace_bitmap]
+        self.tlb_lock = lock()
+        self.stats_lock = lock()
 
         print('欢迎使用OS进程管理系统！      杨宗健20221543')
         print("计算机的初始内存使用情况如下所示（位示图）:")
@@ -116,23 +993,15 @@ class ProcessManager:
         for idx, bit in enumerate(self.replace_bitmap):
             print(f"第{idx}字节  {bit}")
 
-    @staticmethod
-    def add_to_queue(head: PCB, process: PCB) -> PCB:
-        """
-        将进程加入到特定的队列中（就绪或阻塞）
-        :param head: 队列的队头
-        :param process: 进程对象
-        :return: 队列的队头或进程对象
-        """
-        process.state = '就绪'
-        if head is None:
-            return process
-        else:
-            current = head
-            while current.next:
-                current = current.next
-            current.next = process
-        return head
+    @property
+    def ready_head(self):
+        """就绪队列队头"""
+        return self.ready.head
+
+    @property
+    def blocked_head(self):
+        """阻塞队列队头"""
+        return self.blocked.head
 
     @staticmethod
     def locate_block(block_no: int) -> tuple:
@@ -149,22 +1018,26 @@ class ProcessManager:
         :param process: 进程对象。
         :return：如果分配成功，返回进程对象；如果分配失败，返回 None。
         """
-        cnt = 0
-        for i in range(BLOCK_NUM // BYTE_LENGTH):
-            for j in range(BYTE_LENGTH):
-                if self.bitmap[i].get(j) == 0:
-                    if cnt < process.block_num and cnt < INPUT_NUM:
-                        self.bitmap[i].use(j)
-                        process.page_table[cnt].allot(i * BYTE_LENGTH + 7 - j)
-                        cnt += 1
+        cnt, need = 0, min(process.block_num, INPUT_NUM)
+        while cnt < need:
+            block = self.alloc_frame()
+            if block is None:
+                break
+            process.page_table[cnt].allot(block)
+            process.resident.push(cnt)
+            cnt += 1
         if cnt == process.block_num:
             print(f"进程{process.name}内存分配成功！")
-        else:
-            # 剩余部分放入置换区
+        elif not process.lazy:
+            # 剩余部分放入置换区（多级页表进程在页面首次访问时才分配置换区）
             for i in range(cnt, process.block_num):
-                process.page_table[i].extra_pos(self.replace_bitmap)
+                address = self.alloc_swap()
+                if address is None:
+                    break
+                process.page_table[i].address = address
         return process
 
+    @synchronized('queue_lock')
     def create_process(self, name: str, size: int) -> None:
         """
         创建一个新进程，包括检查进程是否存在，内存分配，和进程控制块(PCB)的创建
@@ -176,46 +1049,367 @@ class ProcessManager:
             print(f"进程 {name} 已存在。")
             return
 
+        try:
+            pid = self.pid_allocator.allocate()
+        except RuntimeError as e:
+            print(f"无法创建进程 {name}：{e}")
+            return
+
         # 尝试分配内存
-        new_pcb = self.allocate_memory(PCB(name, size, self.pc + 1))
+        new_pcb = PCB(name, size, self.pc + 1, self.page_table_levels, pid)
+        if self.thread_safe:
+            new_pcb.lock = threading.RLock()
+        new_pcb = self.allocate_memory(new_pcb)
         if new_pcb is not None:
             # 成功分配内存后，增加指令计数器pc
             self.pc += 1
+            self.processes[name] = self.pid_index[new_pcb.pid] = new_pcb
             # 如果已经有运行中的进程，将新进程添加到就绪队列
             if self.running is not None:
-                self.ready_head = self.add_to_queue(self.ready_head, new_pcb)
+                self.ready.enqueue(new_pcb)
                 print(f"进程 {name} 已被创建并添加至就绪队列.")
             # 如果没有运行中的进程，即系统空闲，则直接运行新创建的进程
             else:
                 self.running = new_pcb
+                new_pcb.state = '执行'
                 print(f'进程 {name} 已创建，并执行.')
         # 如果无法成功分配内存，打印错误信息
         else:
+            self.pid_allocator.free(pid)
             print(f"无法为进程 {name} 分配内存，内存不足！")
 
     def free_memory(self, process: PCB) -> None:
         """
-        释放进程的内存，将进程占用的内存块状态分别置 0
+        释放进程的内存，将进程占用的内存块及置换区块状态分别置 0
         """
         for page in process.page_table:
             if page.state == 1:
-                i, j = self.locate_block(page.block)
-                self.bitmap[i].free(j)
+                self.release_frame(page.block)
+            if page.address is not None:
+                self.release_swap(page.address)
+        self.frame_allocator.forget(process)
+        if self.readahead:
+            self.readahead.forget(process)
+
+    def free_frames(self) -> int:
+        """内存中的空闲块数"""
+        return sum(8 - bin(bit.val).count('1') for bit in self.bitmap)
+
+    def largest_free_run(self) -> int:
+        """内存中最长的连续空闲块数，反映外部碎片程度"""
+        bits = ''.join(str(bit) for bit in self.bitmap)  # 各字节的最高位为块号最小的块，拼接后即按块号排列
+        return max(map(len, bits.split('1')))
+
+    def swap_used(self) -> int:
+        """置换区已占用的块数"""
+        return sum(bin(bit.val).count('1') for bit in self.replace_bitmap)
+
+    def alloc_frame(self):
+        """
+        从内存位示图中分配一个空闲块。
+        :return: 块号，内存已满时返回 None
+        """
+        for i, bit in enumerate(self.bitmap):
+            if bit.val != 0xFF:  # 先无锁检查，跳过已占满的字节
+                with self.bitmap_locks[i]:
+                    if bit.val != 0xFF:
+                        j = (~bit.val & 0xFF).bit_length() - 1  # 最高的空闲位，即该字节内块号最小的空闲块
+                        bit.use(j)
+                        return i * BYTE_LENGTH + 7 - j
+        return None
+
+    def release_frame(self, block_no: int) -> None:
+        """释放内存块"""
+        i, j = self.locate_block(block_no)
+        with self.bitmap_locks[i]:
+            self.bitmap[i].free(j)
+
+    def alloc_swap(self):
+        """
+        从置换区位示图中分配一个空闲块。
+        :return: 置换区块号，置换区已满时返回 None
+        """
+        for i, bit in enumerate(self.replace_bitmap):
+            if bit.val != 0xFF:
+                with self.swap_locks[i]:
+                    if bit.val != 0xFF:
+                        j = (~bit.val & 0xFF).bit_length() - 1
+                        bit.use(j)
+                        return i * BYTE_LENGTH + 7 - j
+        return None
+
+    def release_swap(self, slot: int) -> None:
+        """释放置换区块"""
+        i, j = self.locate_block(slot)
+        with self.swap_locks[i]:
+            self.replace_bitmap[i].free(j)
+
+    def evict_page(self, process: PCB, page_no: int, release: bool = True) -> int:
+        """
+        将进程的一个驻留页换出到置换区。页面换入后仍保留其置换区块，换出时直接写回该块。
+        :param process: 页面所属进程
+        :param page_no: 页号
+        :param release: 是否将腾出的内存块归还位示图
+        :return: 腾出的内存块号
+        """
+        page = process.page_table[page_no]
+        write_back = page.address is None or page.dirty  # 置换区中尚无该页副本或副本已过期时必须写出
+        if page.address is None:
+            page.address = self.alloc_swap()
+            if page.address is None:
+                raise RuntimeError('置换区已满！')
+        with self.stats_lock:
+            if write_back:
+                self.stats.swap_outs += 1
             else:
-                i, j = self.locate_block(page.address)
-                self.replace_bitmap[i].free(j)
+                self.stats.clean_drops += 1  # 置换区中的副本仍有效，直接丢弃
+        if write_back and self.page_store:
+            self.page_store.page_out(page.block, page.address)
+        page.dirty = False
+        block = page.block
+        page.block = None
+        page.state = 0
+        process.resident.remove(page_no)
+        if self.readahead:
+            self.readahead.evicted(process, page_no)
+        if process is self.running:
+            with self.tlb_lock:
+                self.tlb.invalidate(page_no)
+        if release:
+            self.release_frame(block)
+        return block
+
+    def choose_victim_page(self, process: PCB) -> int:
+        """
+        按置换算法在进程驻留集中选择淘汰页。
+        FIFO、LRU 直接取栈底；CLOCK 以栈底为指针位置循环扫描，
+        先找（未访问, 未修改）的页，再找（未访问, 已修改）的页并沿途清除访问位。
+        :return: 页号
+        """
+        resident = process.resident
+        if self.policy != 'CLOCK':
+            return resident.bottom()
+        for _ in range(2):
+            for want_dirty in (False, True):
+                for _ in range(len(resident)):
+                    page_no = resident.bottom()
+                    page = process.page_table[page_no]
+                    if not page.referenced and page.dirty == want_dirty:
+                        return page_no
+                    if want_dirty:
+                        page.referenced = False
+                    resident.push(page_no)  # 指针前移
+        return resident.bottom()
 
+    def _steal_frame(self, process: PCB = None, release: bool = False) -> int:
+        """
+        淘汰一页并返回腾出的内存块。局部置换在本进程驻留集中选择，全局置换（或本进程无驻留页时）
+        按各进程驻留集栈底页的访问时间从旧到新尝试，在最久未访问的进程中选择。
+        线程安全模式下调用者已持有本进程的锁，其他进程的锁只尝试获取，获取失败则换下一个进程，以免死锁。
+        :param process: 缺页进程，后台回收时为 None
+        :param release: 是否将腾出的内存块归还位示图
+        :return: 内存块号
+        """
+        if process is not None and self.frame_allocator.scope == 'LOCAL' and process.resident:
+            return self.evict_page(process, self.choose_victim_page(process), release=release)
+        candidates = []
+        for candidate in list(self.processes.values()):
+            if not candidate.resident:
+                continue
+            try:
+                candidates.append((candidate.page_table[candidate.resident.bottom()].visit_time, candidate.pid,
+                                   candidate))
+            except IndexError:  # 检查后驻留集被其他线程清空
+                continue
+        for _, _, victim in sorted(candidates, key=lambda c: c[:2]):
+            if victim is not process and not victim.lock.acquire(blocking=False):
+                continue
+            try:
+                if victim.resident and victim.state != '完成':
+                    return self.evict_page(victim, self.choose_victim_page(victim), release=release)
+            finally:
+                if victim is not process:
+                    victim.lock.release()
+        raise RuntimeError('没有可用的内存块！')
+
+    def handle_page_fault(self, process: PCB, page) -> None:
+        """
+        缺页中断处理：优先使用空闲块（局部置换时不超过进程的驻留集上限），否则按置换算法淘汰一页。
+        :param process: 缺页进程
+        :param page: 缺页的页表项
+        """
+        process.faults += 1
+        block = self._fault_frame(process)
+        with self.stats_lock:
+            self.stats.faults += 1
+            if page.address is None:
+                self.stats.zero_fills += 1  # 首次访问的页面，无需从置换区读入
+            else:
+                self.stats.swap_ins += 1
+        if page.address is None:
+            if self.page_store:
+                self.page_store.zero_fill(block)
+        else:
+            if self.page_store:
+                self.page_store.page_in(page.address, block)
+        page.block = block
+        page.state = 1
+        page.dirty = False
+        process.resident.push(page.no)
+
+    def _fault_frame(self, process: PCB) -> int:
+        """为缺页或预读的页面取得一个内存块：优先使用空闲块（局部置换时不超过进程的驻留集上限），否则淘汰一页"""
+        block = None
+        if self.frame_allocator.scope == 'GLOBAL' or len(process.resident) < process.quota:
+            block = self.alloc_frame()
+        if block is None:
+            block = self._steal_frame(process)
+        elif self.reclaimer:
+            self.reclaimer.wake(self)
+        return block
+
+    def prefetch_page(self, process: PCB, page) -> None:
+        """
+        预读：将置换区中的页面提前读入内存。预读页的访问位清零，使其在被访问之前优先被淘汰。
+        :param process: 页面所属进程
+        :param page: 预读的页表项，须已在置换区中
+        """
+        block = self._fault_frame(process)
+        with self.stats_lock:
+            self.stats.prefetches += 1
+        if self.page_store:
+            self.page_store.page_in(page.address, block)
+        page.block = block
+        page.state = 1
+        page.dirty = False
+        page.referenced = False
+        page.visit_time = self.clock
+        process.resident.push(page.no)
+
+    def access(self, process: PCB, logic_addr: int, write: bool = False) -> int:
+        """
+        模拟进程的一次访存：必要时处理缺页，并更新置换算法与内存块分配策略的状态。
+        :param process: 访存的进程
+        :param logic_addr: 逻辑地址
+        :param write: 是否为写操作
+        :return: 物理地址
+        """
+        page_no, offset = divmod(logic_addr, PAGE_SIZE)
+        if not 0 <= page_no < process.block_num:
+            raise ValueError('地址越界！')
+        with process.lock:
+            if process.state == '完成':
+                raise ValueError(f'进程 {process.name} 已结束！')
+            page = process.page_table[page_no]
+            self.clock = tick = next(self._ticks)
+            process.refs += 1
+            fault = page.state != 1
+            if fault:
+                self.handle_page_fault(process, page)
+            elif self.policy == 'LRU':
+                process.resident.push(page_no)
+            page.visit_time = tick
+            page.referenced = True
+            if write:
+                page.dirty = True
+            physical = page.block * BLOCK_SIZE + offset
+            if write and self.page_store:
+                self.page_store.frame(page.block)[offset] = tick & 0xFF  # 写入内容，使换出时有真实数据需要保存
+            self.frame_allocator.record(self, process, page_no, fault)
+            if self.readahead:
+                self.readahead.record(self, process, page_no, fault)
+            return physical
+
+    def replay(self, trace) -> dict:
+        """
+        回放多进程访存序列，回放前清零换页统计。序列中的进程不存在时抛出 ValueError。
+        :param trace: 可迭代的 (进程名或pid, 逻辑地址[, 是否写]) 序列
+        :return: 访存次数、换页统计（缺页、写回、丢弃、预读次数及I/O开销）、预读命中与浪费的页数及各进程的缺页次数
+        """
+        self.stats.reset()
+        if self.readahead:
+            self.readahead.reset()
+        refs = 0
+        for event in trace:
+            process = self.find_process(event[0])
+            if process is None:
+                raise ValueError('进程不存在！')
+            self.access(process, *event[1:])
+            if self.reclaimer:
+                self.reclaimer.tick(self)
+            if self.telemetry:
+                self.telemetry.tick(self)
+            refs += 1
+        result = {'refs': refs, **self.stats.as_dict()}
+        if self.readahead:
+            result['prefetch_hits'] = self.readahead.hits
+            result['prefetch_wasted'] = self.readahead.wasted
+        result['per_process'] = {name: p.faults for name, p in self.processes.items()}
+        return result
+
+    def _walk_page_table(self, page_no: int) -> int:
+        """
+        快表未命中时查询当前进程的页表，并将映射装入快表。
+        :param page_no: 页号
+        :return: 物理块号
+        """
+        if not 0 <= page_no < len(self.running.page_table):
+            raise ValueError('地址越界！')
+        block = self.running.page_table[page_no].block
+        if block is None:
+            raise ValueError(f'{page_no} 号页不在内存中！')
+        self.tlb.insert(page_no, block)
+        return block
+
+    @synchronized('tlb_lock')
     def locate_addr(self, logic_addr: int) -> int:
         """
         输入当前执行进程所要访问的逻辑地址，并将其转换成相应的物理地址.
         :param logic_addr: 逻辑地址
         :return: 物理地址
         """
-        page_no = logic_addr // PAGE_SIZE
-        offset = logic_addr % PAGE_SIZE
-        if page_no > len(self.running.page_table):
-            raise ValueError('地址越界！')
-        return self.running.page_table[page_no].block * BLOCK_SIZE + offset
+        page_no, offset = divmod(logic_addr, PAGE_SIZE)
+        block = self.tlb.lookup(page_no)
+        if block is None:
+            block = self._walk_page_table(page_no)
+        return block * BLOCK_SIZE + offset
+
+    @synchronized('tlb_lock')
+    def locate_addrs(self, logic_addrs) -> list[int]:
+        """
+        批量地址变换，快表命中的地址不再查询页表。
+        :param logic_addrs: 逻辑地址序列
+        :return: 物理地址列表
+        """
+        lookup, walk = self.tlb.lookup, self._walk_page_table
+        physical = []
+        for logic_addr in logic_addrs:
+            page_no, offset = divmod(logic_addr, PAGE_SIZE)
+            block = lookup(page_no)
+            if block is None:
+                block = walk(page_no)
+            physical.append(block * BLOCK_SIZE + offset)
+        return physical
+
+    def translate_many(self, logic_addrs) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        向量化的批量地址变换，直接查询当前进程页表的物理块号数组，不经过快表。
+        :param logic_addrs: 逻辑地址数组
+        :return: (物理地址数组, 缺页掩码, 越界掩码)，缺页或越界处的物理地址为 -1
+        """
+        addrs = np.asarray(logic_addrs, dtype=np.int64)
+        page_nos = addrs >> PAGE_SHIFT
+        bounds = page_nos.view(np.uint64) >= self.running.block_num  # 负地址按无符号数解释后必然越界
+        if self.running.block_num == 0:
+            return np.full(addrs.shape, -1, dtype=np.int64), np.zeros(addrs.shape, dtype=bool), bounds
+        blocks = self.running.lookup_frames(page_nos)
+        invalid = blocks < 0
+        invalid |= bounds
+        fault = invalid ^ bounds
+        physical = blocks << PAGE_SHIFT
+        physical |= addrs & (PAGE_SIZE - 1)
+        np.copyto(physical, -1, where=invalid)
+        return physical, fault, bounds
 
     def process_exists(self, name: str) -> bool:
         """
@@ -224,25 +1418,15 @@ class ProcessManager:
         :return:
              bool: 如果系统中存在指定名称的进程，则返回True；否则返回False。
         """
-        # 检查就绪队列
-        current = self.ready_head
-        while current:
-            if current.name == name:
-                return True
-            current = current.next
-
-        # 检查阻塞队列
-        current = self.blocked_head
-        while current:
-            if current.name == name:
-                return True
-            current = current.next
+        return name in self.processes
 
-        # 检查正在执行的进程
-        if self.running and self.running.name == name:
-            return True
-
-        return False
+    def find_process(self, key):
+        """
+        根据进程名称或 pid 查找进程。
+        :param key: 进程名称或 pid
+        :return: PCB 对象，不存在时返回 None；其当前状态见 PCB.state
+        """
+        return self.processes.get(key) or self.pid_index.get(key)
 
     def event_handler(self) -> None:
         """事件处理函数，用于根据用户输入执行相应的操作。"""
@@ -268,7 +1452,7 @@ class ProcessManager:
             elif choice == '3':
                 self.block_process()
             elif choice == '4':
-                self.wake_process()
+                self.wake_process(input("唤醒进程名称（直接回车唤醒阻塞队列队头）: ").strip() or None)
             elif choice == '5':
                 self.terminate_process()
             elif choice == '6':
@@ -293,55 +1477,59 @@ class ProcessManager:
             else:
                 print("非法命令，请重试！")
 
+    @synchronized('queue_lock')
     def trans_running(self) -> None:
         """
         用于将就绪队列队头进程自动进入运行态。
         """
-        self.running = None
-        if self.ready_head is None:
+        with self.tlb_lock:
+            self.tlb.flush()  # 进程切换，清空快表
+        self.running = self.ready.dequeue()
+        if self.running is None:
             return
-        self.running = self.ready_head
-        if self.ready_head.next is not None:
-            self.ready_head = self.ready_head.next
-        else:
-            self.ready_head = None
-        self.running.next = None
         self.running.state = '执行'
         print(f"进程 {self.running.name} 正在运行...")
 
+    @synchronized('queue_lock')
     def execute_process(self) -> None:
         """
         执行时间片到，将正在运行的进程进入就绪态。
         """
         if self.running:
             print(f"将进程 {self.running.name} 时间片到")
-            self.ready_head = self.add_to_queue(self.ready_head, self.running)
+            self.ready.enqueue(self.running)
 
             self.trans_running()  # 此时无正在运行的进程，应将就绪队列队头进程运行
         else:
             print('没有正在执行的进程')
 
+    @synchronized('queue_lock')
     def block_process(self) -> None:
         """阻塞进程，将正在运行的进程进入阻塞队列，并轮转就绪队列队头运行。"""
         if self.running:
-            self.running.state = '阻塞'
-            self.blocked_head = self.add_to_queue(self.blocked_head, self.running)
+            self.blocked.enqueue(self.running)
             print(f"阻塞进程 {self.running.name} 并将其移动至阻塞队列.")
 
             self.trans_running()  # 此时无正在运行的进程，应将就绪队列队头进程运行
         else:
             print("没有进程可被阻塞.")
 
-    def wake_process(self) -> None:
+    @synchronized('queue_lock')
+    def wake_process(self, name: str = None) -> None:
         """
         唤醒进程，将阻塞的进程重新加入到就绪队列中。
+        :param name: 要唤醒的进程名称或 pid，为空时唤醒阻塞队列队头进程
         """
-        if self.blocked_head:
-            process = self.blocked_head
-            self.blocked_head = self.blocked_head.next
-            process.next = None
-            process.state = '就绪'
-            self.ready_head = self.add_to_queue(self.ready_head, process)
+        if name is not None:
+            process = self.find_process(name)
+            if process is None or process.queue is not self.blocked:
+                print(f"进程 {name} 不在阻塞队列中.")
+                return
+            self.blocked.remove(process)
+        else:
+            process = self.blocked.dequeue()
+        if process:
+            self.ready.enqueue(process)
             print(f"唤醒进程 {process.name} 并将其添加至就绪队列.")
 
             if self.running is None:
@@ -349,21 +1537,35 @@ class ProcessManager:
         else:
             print("没有阻塞的进程等待唤醒.")
 
-    def terminate_process(self) -> None:
-        """杀死正在运行的的进程，并释放该进程所分配到的内存空间，轮转运行就绪队列队头。"""
-        if self.running:
-            print(f"正在结束进程 {self.running.name} ...")
-            self.free_memory(self.running)
+    @synchronized('queue_lock')
+    def terminate_process(self, name: str = None) -> None:
+        """
+        杀死正在运行的的进程，并释放该进程所分配到的内存空间，轮转运行就绪队列队头。
+        :param name: 要结束的进程名称或 pid，为空时结束正在运行的进程；指定就绪或阻塞的进程时将其移出所在队列
+        """
+        process = self.running if name is None else self.find_process(name)
+        if process is None:
+            print("没有可被结束的进程." if name is None else f"进程 {name} 不存在.")
+            return
+        print(f"正在结束进程 {process.name} ...")
+        if process is not self.running:
+            process.queue.remove(process)
+        with process.lock:  # 先标记为完成，使其他线程不再访问或淘汰该进程的页面
+            process.state = '完成'
+            self.free_memory(process)
+        del self.processes[process.name]
+        del self.pid_index[process.pid]
+        self.pid_allocator.free(process.pid)
 
+        if process is self.running:
             self.trans_running()
-        else:
-            print("没有可被结束的进程.")
 
     def FIFO(self) -> None:
         """
         FIFO页面置换算法模拟，并计算缺页率和置换次数
         """
-        deque = collections.deque(self.running.page_table[:3], maxlen=3)  # 创建进程时分配到内存的三个页表
+        resident = [self.running.page_table[no] for no in self.running.resident]  # 当前驻留在内存中的页表
+        deque = collections.deque(resident, maxlen=len(resident))
         s = f = 0
         addr_seq = [random.randint(0, self.running.memory_size) for _ in range(5)]
         print(f"自动随机生成范围为[0, {self.running.memory_size}]、长度为10的进程逻辑地址序列：{addr_seq}")
@@ -375,13 +1577,21 @@ class ProcessManager:
             # 若没有命中
             if curr_page.block is None:
                 f += 1
+                if curr_page.address is None:  # 首次访问的页面，为其分配置换区
+                    curr_page.extra_pos(self.replace_bitmap)
                 print(f"{page_no} 号页不存在于内存, 外存块号为{curr_page.address}，需置换...")
                 pop_page = deque.popleft()
                 deque.append(curr_page)
                 print(f"\t利用FIFO算法选中内存队列0号页,该页内存块号为{pop_page.block}, 修改位为{pop_page.dirty},")
                 print(f"\t内存 {pop_page.block} 号块内容写入置换区 {curr_page.address} 号块,")
                 print(f"\t置换区 {curr_page.address} 内容写入内存 {pop_page.block} 号块--置换完毕！")
+                if self.page_store and pop_page.block is not None and curr_page.address is not None:
+                    self.page_store.exchange(pop_page.block, curr_page.address)
                 curr_page.swap_with(pop_page)
+                self.tlb.invalidate(pop_page.no)
+                if pop_page.no in self.running.resident:
+                    self.running.resident.remove(pop_page.no)
+                self.running.resident.push(curr_page.no)
             else:
                 s += 1
                 print(f"{page_no} 号页已存在于内存, 无需置换")
@@ -392,7 +1602,8 @@ class ProcessManager:
         """
         LRU页面置换算法模拟，并计算缺页率和置换次数。
         """
-        stack = UniqueStack(self.running.page_table[:3])
+        resident = [self.running.page_table[no] for no in self.running.resident]  # 当前驻留在内存中的页表
+        stack = UniqueStack(resident, capacity=len(resident))
         s = f = 0
         addr_seq = [random.randint(0, self.running.memory_size) for _ in range(5)]
         print(f"自动随机生成范围为[0, {self.running.memory_size}]、长度为10的进程逻辑地址序列：{addr_seq}")
@@ -404,12 +1615,20 @@ class ProcessManager:
             # 若没有命中
             if curr_page.block is None:
                 f += 1
+                if curr_page.address is None:  # 首次访问的页面，为其分配置换区
+                    curr_page.extra_pos(self.replace_bitmap)
                 print(f"{page_no} 号页不存在于内存, 外存块号为{curr_page.address}，需置换...")
                 pop_page = stack.bottom()
                 print(f"\t利用LRU算法选中内存栈栈底页,该页内存块号为{pop_page.block}, 修改位为{pop_page.dirty},")
                 print(f"\t内存 {pop_page.block} 号块内容弹出栈，写入置换区 {curr_page.address} 号块,")
                 print(f"\t置换区 {curr_page.address} 内容入栈，写入内存 {pop_page.block} 号块--置换完毕！")
+                if self.page_store and pop_page.block is not None and curr_page.address is not None:
+                    self.page_store.exchange(pop_page.block, curr_page.address)
                 curr_page.swap_with(pop_page)
+                self.tlb.invalidate(pop_page.no)
+                if pop_page.no in self.running.resident:
+                    self.running.resident.remove(pop_page.no)
+                self.running.resident.push(curr_page.no)
             else:
                 s += 1
                 print(f"{page_no} 号页已存在于内存, 无需置换，将该页放在栈顶。")
@@ -421,11 +1640,8 @@ class ProcessManager:
         """程序测试时设计的demo函数，可简便调试环节，节省进程创建时间。"""
         print('正在构建demo...')
         self.create_process(name='Music', size=1028)
-        time.sleep(1)
         self.create_process(name='Vidio', size=10240)
-        time.sleep(1)
         self.create_process(name='Print', size=4096)
-        time.sleep(1)
         self.create_process(name='Game', size=10240)
         self.show_queues_and_memory()
 
@@ -433,22 +1649,18 @@ class ProcessManager:
         # 就绪队列
         print("\n就绪队列:")
         print(f"{'名称':<10}{'大小':<10}{'PC值':<20}{'pid':<20}{'页表':<10}")
-        current = self.ready_head
-        while current:
+        for current in self.ready:
             print(
                 f"{current.name:<10}{current.memory_size:<10}{current.pc:<20}"
                 f"{current.pid:<20}{str(current.page_table):<10}")
-            current = current.next
 
         # 阻塞队列
         print("\n阻塞队列:")
         print(f"{'名称':<10}{'大小':<10}{'PC值':<20}{'pid':<20}{'页表':<10}")
-        current = self.blocked_head
-        while current:
+        for current in self.blocked:
             print(
                 f"{current.name:<10}{current.memory_size:<10}{current.pc:<20}"
                 f"{current.pid:<20}{str(current.page_table):<10}")
-            current = current.next
 
         # 运行进程
         if self.running:
@@ -459,6 +1671,16 @@ class ProcessManager:
                 f"{self.running.pc:<20}{self.running.pid:<20}{str(self.running.page_table):<10}")
         else:
             print("\n没有正在运行的进程.")
+        print(self.tlb)
+        print(self.stats)
+        if self.reclaimer:
+            print(self.reclaimer)
+        if self.readahead:
+            print(self.readahead)
+        print(f"空闲块{self.free_frames()}个, 最大连续空闲{self.largest_free_run()}块, "
+              f"置换区占用{self.swap_used()}/{len(self.replace_bitmap) * BYTE_LENGTH}块")
+        if self.telemetry:
+            print(self.telemetry)
 
         # 内存空间
         print("\n内存空间（位示图）:")
@@ -471,6 +1693,140 @@ class ProcessManager:
             print(f"第{idx}字节  {bit}")
 
 
+class EventDriver:
+    """
+    无交互的事件回放驱动器。将创建、时间片到、阻塞、唤醒、结束及访存事件批量施加于 ProcessManager，
+    回放期间屏蔽控制台输出，并统计吞吐量与各类操作的延迟分位数。
+    事件格式：('create', 名称, 大小)、('timeout',)、('block',)、('wake'[, 名称])、('terminate',)、
+    ('access', 名称或None, 逻辑地址[, 是否写])，名称为 None 时访问正在运行的进程。
+    """
+    def __init__(self, pm: ProcessManager, quiet: bool = True):
+        self.pm = pm
+        self.quiet = quiet
+        self.handlers = {
+            'create': lambda name, size: pm.create_process(name, int(size)),
+            'timeout': pm.execute_process,
+            'block': pm.block_process,
+            'wake': lambda name=None: pm.wake_process(name),
+            'terminate': pm.terminate_process,
+            'access': self._access,
+        }
+
+    def _access(self, name, logic_addr, write=False) -> None:
+        process = self.pm.running if name is None else self.pm.find_process(name)
+        if process is None:
+            raise ValueError('进程不存在！')
+        self.pm.access(process, int(logic_addr), bool(write))
+
+    @staticmethod
+    def parse_script(text: str) -> list[tuple]:
+        """
+        解析事件脚本，每行一个事件，如 "create A 2048"、"wake A"、"access A 100 w"，# 之后为注释。
+        :param text: 脚本内容
+        :return: 事件列表
+        """
+        events = []
+        for line in text.splitlines():
+            fields = line.split('#', 1)[0].split()
+            if not fields:
+                continue
+            if fields[0] == 'access':
+                name = None if fields[1] == '-' else fields[1]
+                events.append(('access', name, int(fields[2]), len(fields) > 3 and fields[3] == 'w'))
+            else:
+                events.append(tuple(fields))
+        return events
+
+    @staticmethod
+    def generate(n: int, seed: int = 42, max_pages: int = 4, write_ratio: float = 0.3,
+                 max_processes: int = 16) -> list[tuple]:
+        """
+        随机生成事件流。创建与结束的比例相同，使系统中的进程数保持稳定。
+        生成时记录存活的进程及其页数：结束事件指定要结束的进程，访存事件随机选取一个存活的进程，
+        在其页表范围内随机选页并加上页内偏移；没有存活的进程时改为创建进程，进程数已达上限时改为结束进程。
+        :param n: 事件数
+        :param seed: 随机种子
+        :param max_pages: 新建进程的最大页数
+        :param max_processes: 同时存活的最大进程数，避免进程数随机游走至内存与置换区耗尽
+        :param write_ratio: 访存事件中写操作的比例
+        :return: 事件列表
+        """
+        rng = random.Random(seed)
+        kinds = ['create', 'timeout', 'block', 'wake', 'terminate', 'access']
+        weights = [20, 15, 10, 10, 20, 25]
+        events, created = [], 0
+        names, pages = [], {}  # 存活的进程名及各进程的页数
+        for kind in rng.choices(kinds, weights, k=n):
+            if kind in ('terminate', 'access') and not names:
+                kind = 'create'
+            elif kind == 'create' and len(names) >= max_processes:
+                kind = 'terminate'
+            if kind == 'create':
+                name = f'p{created}'
+                pages[name] = rng.randint(1, max_pages)
+                names.append(name)
+                events.append(('create', name, pages[name] * BLOCK_SIZE))
+                created += 1
+            elif kind == 'terminate':
+                idx = rng.randrange(len(names))
+                names[idx], names[-1] = names[-1], names[idx]  # 与末尾交换后弹出，O(1) 删除
+                name = names.pop()
+                del pages[name]
+                events.append(('terminate', name))
+            elif kind == 'access':
+                name = rng.choice(names)
+                logic_addr = rng.randrange(pages[name]) * BLOCK_SIZE + rng.randrange(BLOCK_SIZE)
+                events.append(('access', name, logic_addr, rng.random() < write_ratio))
+            else:
+                events.append((kind,))
+        return events
+
+    def run(self, events) -> dict:
+        """
+        回放事件序列。
+        :param events: 事件序列
+        :return: 总操作数、错误数、每秒操作数、缺页次数及各类操作的延迟统计（μs）
+        """
+        samples = collections.defaultdict(lambda: array('Q'))
+        errors = collections.Counter()
+        handlers, clock = self.handlers, time.perf_counter_ns
+        telemetry = self.pm.telemetry
+        faults = self.pm.stats.faults
+        with open(os.devnull, 'w') if self.quiet else contextlib.nullcontext(sys.stdout) as out, \
+                contextlib.redirect_stdout(out):
+            start = clock()
+            for event in events:
+                begin = clock()
+                try:
+                    handlers[event[0]](*event[1:])
+                except (ValueError, RuntimeError):
+                    errors[event[0]] += 1
+                samples[event[0]].append(clock() - begin)
+                if telemetry:
+                    telemetry.tick(self.pm)
+            elapsed = clock() - start
+        ops = sum(len(s) for s in samples.values())
+        latency = {}
+        for kind, s in samples.items():
+            lat = np.frombuffer(s, dtype=np.uint64) / 1e3
+            latency[kind] = {'count': len(s), 'p50': float(np.percentile(lat, 50)),
+                             'p90': float(np.percentile(lat, 90)), 'p99': float(np.percentile(lat, 99)),
+                             'max': float(lat.max())}
+        return {'ops': ops, 'errors': dict(errors), 'ops_per_sec': ops / (elapsed / 1e9) if elapsed else 0.0,
+                'faults': self.pm.stats.faults - faults, 'latency': latency}
+
+    @staticmethod
+    def format_report(report: dict) -> str:
+        """将 run 的结果格式化为表格文本"""
+        lines = [f"共 {report['ops']} 次操作, {report['ops_per_sec']:.0f} 次/秒, 失败 {sum(report['errors'].values())} 次, "
+                 f"缺页 {report['faults']} 次",
+                 f"{'操作':<10}{'次数':>8}{'p50(μs)':>10}{'p90(μs)':>10}{'p99(μs)':>10}{'max(μs)':>10}"]
+        for kind, lat in report['latency'].items():
+            lines.append(f"{kind:<10}{lat['count']:>8}{lat['p50']:>10.1f}{lat['p90']:>10.1f}"
+                         f"{lat['p99']:>10.1f}{lat['max']:>10.1f}")
+        return '\n'.join(lines)
+
+
 if __name__ == '__main__':
     # 实例化并启动事件处理
     pm = ProcessManager()
@@ -9,15 +9,44 @@
 * Function: 编写独立于实验内容本身的函数或数据结构
 """
 import random
+import functools
+import collections
+import numpy as np
 random.seed(42)
 
 
+class _Node:
+    """双向链表结点，供 UniqueStack 内部使用。"""
+    __slots__ = ('value', 'prev', 'next')
+
+    def __init__(self, value=None):
+        self.value = value
+        self.prev = self
+        self.next = self
+
+
 class UniqueStack:
-    """用于完成实验二中LRU页面置换算法实现所用到的特殊栈结构。"""
-    def __init__(self, init: list, capacity=3):
-        self.stack = init
-        self.set = set(init)
+    """
+    用于完成实验二中LRU页面置换算法实现所用到的特殊栈结构。
+    内部采用哈希表 + 侵入式双向循环链表实现，入栈、出栈、取栈底均为 O(1)。
+    链表哨兵结点的 next 指向栈底（最久未使用），prev 指向栈顶（最近使用）。
+    """
+    def __init__(self, init: list = None, capacity=3):
         self.capacity = capacity
+        self.nodes = {}  # 元素 -> 链表结点
+        self.sentinel = _Node()
+        for value in init or []:
+            self.push(value)
+
+    def _unlink(self, node: _Node) -> None:
+        node.prev.next = node.next
+        node.next.prev = node.prev
+
+    def _link_top(self, node: _Node) -> None:
+        top = self.sentinel.prev
+        node.prev, node.next = top, self.sentinel
+        top.next = node
+        self.sentinel.prev = node
 
     def push(self, value) -> None:
         """
@@ -25,40 +54,343 @@ class UniqueStack:
         :param value: 入栈元素
         :return: None
         """
-        if value in self.set:  # 如果元素已存在
-            self.stack.remove(value)  # 从栈中移除该元素
-        elif len(self.stack) >= self.capacity:  # 如果栈已满
-            bottom_element = self.stack.pop(0)  # 移除栈底元素
-            self.set.remove(bottom_element)  # 从集合中移除栈底元素
+        node = self.nodes.get(value)
+        if node is not None:  # 如果元素已存在，从链表中摘下
+            self._unlink(node)
+        else:
+            if len(self.nodes) >= self.capacity:  # 如果栈已满，移除栈底元素
+                bottom_node = self.sentinel.next
+                self._unlink(bottom_node)
+                del self.nodes[bottom_node.value]
+            node = self.nodes[value] = _Node(value)
+        self._link_top(node)  # 将元素放入栈顶
+
+    def access_many(self, values) -> int:
+        """
+        批量访问（入栈）一组元素，用于访问序列回放，语义与逐个调用 push 相同。
+        :param values: 可迭代的访问序列
+        :return: 未命中（缺页）次数
+        """
+        nodes, sentinel, capacity = self.nodes, self.sentinel, self.capacity
+        misses = 0
+        for value in values:
+            node = nodes.get(value)
+            if node is not None:
+                if node is sentinel.prev:  # 已在栈顶，无需移动
+                    continue
+                node.prev.next = node.next
+                node.next.prev = node.prev
+            else:
+                misses += 1
+                if len(nodes) >= capacity:
+                    bottom_node = sentinel.next
+                    sentinel.next = bottom_node.next
+                    bottom_node.next.prev = sentinel
+                    del nodes[bottom_node.value]
+                node = nodes[value] = _Node(value)
+            top = sentinel.prev
+            node.prev, node.next = top, sentinel
+            top.next = node
+            sentinel.prev = node
+        return misses
 
-        self.stack.append(value)  # 将新元素放入栈顶
-        self.set.add(value)  # 将新元素添加到集合中
+    def remove(self, value) -> None:
+        """从栈中移除指定元素，元素不存在时抛出 KeyError"""
+        self._unlink(self.nodes.pop(value))
 
     def pop(self):
         """出栈操作"""
         if not self.is_empty():
-            value = self.stack.pop()
-            self.set.remove(value)
-            return value
+            node = self.sentinel.prev
+            self._unlink(node)
+            del self.nodes[node.value]
+            return node.value
         raise IndexError("栈为空！")
 
     def bottom(self):
         """返回栈底元素"""
         if not self.is_empty():
-            return self.stack[0]
+            return self.sentinel.next.value
         raise IndexError("栈为空！")
 
     def is_empty(self):
         """判断栈是否为空"""
-        return len(self.stack) == 0
+        return len(self.nodes) == 0
+
+    def __contains__(self, value) -> bool:
+        return value in self.nodes
+
+    def __iter__(self):
+        """从栈底到栈顶遍历元素"""
+        node = self.sentinel.next
+        while node is not self.sentinel:
+            yield node.value
+            node = node.next
 
     def __len__(self):
         """返回栈的大小"""
-        return len(self.stack)
+        return len(self.nodes)
 
     def __str__(self):
         """打印栈的内容"""
-        return str(self.stack)
+        return str(list(self))
+
+
+class PIDAllocator:
+    """
+    基于位图的进程号分配器。进程号从上次分配的位置起循环递增分配，
+    到达上限后回绕，复用已释放的进程号；按64位字扫描查找空闲位。
+    """
+    def __init__(self, max_pid: int = 32768, min_pid: int = 1):
+        """
+        :param max_pid: 进程号上限（不含）
+        :param min_pid: 最小进程号，回绕后从此处开始查找
+        """
+        self.min_pid = min_pid
+        self.max_pid = max_pid
+        self.words = [0] * ((max_pid + 63) // 64)
+        self.next_pid = min_pid  # 下次查找的起点
+        self.used = 0
+
+    def _find_free(self, start: int, stop: int):
+        """在 [start, stop) 中查找第一个空闲进程号，找不到时返回 None"""
+        idx = start >> 6
+        word = ~self.words[idx] & (~0 << (start & 63))  # 屏蔽起点之前的位
+        while True:
+            if word & 0xFFFFFFFFFFFFFFFF:
+                pid = (idx << 6) + ((word & -word).bit_length() - 1)
+                return pid if pid < stop else None
+            idx += 1
+            if idx << 6 >= stop:
+                return None
+            word = ~self.words[idx]
+
+    def allocate(self) -> int:
+        """分配一个空闲进程号"""
+        if self.used >= self.max_pid - self.min_pid:
+            raise RuntimeError('进程号已耗尽！')
+        pid = self._find_free(self.next_pid, self.max_pid)
+        if pid is None:  # 回绕
+            pid = self._find_free(self.min_pid, self.next_pid)
+        self.words[pid >> 6] |= 1 << (pid & 63)
+        self.used += 1
+        self.next_pid = pid + 1 if pid + 1 < self.max_pid else self.min_pid
+        return pid
+
+    def free(self, pid: int) -> None:
+        """释放进程号"""
+        if pid not in self:
+            raise ValueError(f'进程号 {pid} 未被分配！')
+        self.words[pid >> 6] &= ~(1 << (pid & 63))
+        self.used -= 1
+
+    def __contains__(self, pid: int) -> bool:
+        return self.min_pid <= pid < self.max_pid and bool(self.words[pid >> 6] >> (pid & 63) & 1)
+
+    def __len__(self) -> int:
+        """已分配的进程号个数"""
+        return self.used
+
+
+class NullLock:
+    """空锁，在无需线程安全时代替 threading.Lock，使加锁代码无额外开销。"""
+    def acquire(self, blocking=True, timeout=-1) -> bool:
+        return True
+
+    def release(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+def synchronized(lock_name: str):
+    """
+    方法装饰器，调用方法时持有对象上名为 lock_name 的锁。
+    :param lock_name: 锁属性名
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with getattr(self, lock_name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class RingBuffer:
+    """定长环形缓冲区，以 numpy 结构化数组紧凑存放记录，写满后覆盖最旧的记录。"""
+    def __init__(self, dtype, capacity: int = 4096):
+        """
+        :param dtype: 记录的 numpy 数据类型
+        :param capacity: 最多保存的记录数
+        """
+        if capacity <= 0:
+            raise ValueError('容量必须为正数！')
+        self.data = np.zeros(capacity, dtype=dtype)
+        self.capacity = capacity
+        self.head = 0   # 下一条记录的写入位置
+        self.count = 0  # 累计写入的记录数
+
+    def append(self, record: tuple) -> None:
+        """写入一条记录"""
+        self.data[self.head] = record
+        self.head = (self.head + 1) % self.capacity
+        self.count += 1
+
+    def extend(self, records: np.ndarray) -> None:
+        """
+        批量写入记录
+        :param records: 与缓冲区数据类型相同的结构化数组
+        """
+        n = len(records)
+        if n >= self.capacity:
+            self.data[:] = records[n - self.capacity:]
+            self.head = 0
+        else:
+            first = min(n, self.capacity - self.head)
+            self.data[self.head:self.head + first] = records[:first]
+            self.data[:n - first] = records[first:]
+            self.head = (self.head + n) % self.capacity
+        self.count += n
+
+    @property
+    def dropped(self) -> int:
+        """被覆盖的记录数"""
+        return max(self.count - self.capacity, 0)
+
+    def to_array(self) -> np.ndarray:
+        """按写入顺序返回缓冲区中的记录（副本）"""
+        if self.count <= self.capacity:
+            return self.data[:self.count].copy()
+        return np.concatenate((self.data[self.head:], self.data[:self.head]))
+
+    def clear(self) -> None:
+        self.head = self.count = 0
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+
+class LRUCache:
+    """容量有限的LRU缓存，基于 OrderedDict 实现：命中时将键移到末尾，超出容量时淘汰最久未使用的键。"""
+    def __init__(self, capacity: int = 1024, on_evict=None):
+        """
+        :param capacity: 最多缓存的键数
+        :param on_evict: 键因超出容量被淘汰时的回调 on_evict(key, value)，可用于写回
+        """
+        if capacity <= 0:
+            raise ValueError('容量必须为正数！')
+        self.capacity = capacity
+        self.on_evict = on_evict
+        self.data = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        """查找键，命中时将其标记为最近使用"""
+        try:
+            value = self.data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self.data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value) -> None:
+        """插入或更新键，超出容量时淘汰最久未使用的键"""
+        self.data[key] = value
+        self.data.move_to_end(key)
+        if len(self.data) > self.capacity:
+            old_key, old_value = self.data.popitem(last=False)
+            if self.on_evict:
+                self.on_evict(old_key, old_value)
+
+    def pop(self, key, default=None):
+        """移除键并返回其值"""
+        return self.data.pop(key, default)
+
+    def clear(self) -> None:
+        self.data.clear()
+
+    def items(self):
+        """按从最久未使用到最近使用的顺序遍历键值对"""
+        return self.data.items()
+
+    def __contains__(self, key) -> bool:
+        return key in self.data
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+
+class PathCache(LRUCache):
+    """
+    以 / 分隔的绝对路径为键的LRU缓存。另按父路径登记已缓存的子路径（中间路径即使已被淘汰也保留登记），
+    使整棵子树失效的开销只与子树中缓存的路径数成正比，而与缓存总容量无关。
+    """
+    def __init__(self, capacity: int = 1024):
+        super().__init__(capacity, on_evict=self._evicted)
+        self.children = {}  # 路径 -> 已登记的子路径集合，根目录为空串
+
+    def put(self, key, value) -> None:
+        if key not in self.data:
+            self._link(key)
+        super().put(key, value)
+
+    def pop(self, key, default=None):
+        value = super().pop(key, default)
+        self._unlink(key)
+        return value
+
+    def invalidate(self, key, subtree=True) -> int:
+        """
+        删除或改名后使路径 key 的缓存失效
+        :param subtree: 是否连同其下所有已缓存的路径一并失效，文件没有下级路径，只需移除自身
+        :return: 移除的键数
+        """
+        if not subtree:
+            return int(self.pop(key) is not None)
+        removed = 0
+        stack = [key]
+        while stack:
+            path = stack.pop()
+            stack.extend(self.children.pop(path, ()))
+            if self.data.pop(path, None) is not None:
+                removed += 1
+        self._unlink(key)
+        return removed
+
+    def clear(self) -> None:
+        super().clear()
+        self.children.clear()
+
+    def _link(self, key) -> None:
+        """沿父路径逐级登记，遇到已登记的路径即停止"""
+        while key:
+            parent = key.rpartition('/')[0]
+            siblings = self.children.setdefault(parent, set())
+            if key in siblings:
+                return
+            siblings.add(key)
+            key = parent
+
+    def _unlink(self, key) -> None:
+        """路径既不在缓存中也没有登记的子路径时取消登记，并沿父路径逐级清理"""
+        while key and key not in self.data and not self.children.get(key):
+            self.children.pop(key, None)
+            parent = key.rpartition('/')[0]
+            siblings = self.children.get(parent)
+            if siblings is not None:
+                siblings.discard(key)
+            key = parent
+
+    def _evicted(self, key, value) -> None:
+        self._unlink(key)
 
 
 class Bit: